@@ -0,0 +1,47 @@
+import random
+import numpy as np
+
+
+class AliasSampler:
+    """
+    Utežen izbor v O(1) po Walker/Vose metodi.
+    Tabeli prob/alias se zgradita enkrat (npr. ob nalaganju stanja), nato vsak izbor
+    porabi eno enakomerno naključno število.
+    """
+    def __init__(self, weights: list[float]) -> None:
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("AliasSampler potrebuje vsaj eno pozitivno utež.")
+        self.n: int = n
+        scaled = [w * n / total for w in weights]
+        prob = [0.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Ostanki (zaradi zaokrožitvenih napak) so vedno izbrani sami.
+        for i in large + small:
+            prob[i] = 1.0
+
+        self.prob: list[float] = prob
+        self.alias: list[int] = alias
+        self._prob_array = np.array(prob, dtype=np.float64)
+        self._alias_array = np.array(alias, dtype=np.int64)
+
+    def sample(self, rng: random.Random) -> int:
+        u = rng.random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def sample_batch(self, generator: np.random.Generator, size: int) -> np.ndarray:
+        u = generator.random(size) * self.n
+        i = u.astype(np.int64)
+        return np.where(u - i < self._prob_array[i], i, self._alias_array[i])
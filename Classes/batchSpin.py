@@ -0,0 +1,251 @@
+import numpy as np
+from Classes.symbol import Symbol
+from Classes.symbolWindow import SymbolWindow
+from Classes.aliasSampler import AliasSampler
+
+# Največja velikost tabele linijskih zmag (število_simbolov ** širina); nad tem se linije ocenjujejo sproti.
+LINE_LUT_LIMIT = 2_000_000
+
+
+class BatchTables:
+    """
+    Celoštevilski zapis enega stanja igre za vektorizirano vrtenje.
+    Simboli so kodirani z indeksi, koluti pa kot tabele (set, kolut, stop, vrstica).
+    """
+    def __init__(self, state) -> None:
+        self.height: int = state.window_height
+        self.symbol_names: list[str] = list(state.symbols)
+        self.symbol_codes: dict[str, int] = {name: i for i, name in enumerate(self.symbol_names)}
+        symbols = [state.symbols[name] for name in self.symbol_names]
+        self.symbols: list[Symbol] = symbols
+        self.is_wild = np.array([s.is_wild for s in symbols], dtype=bool)
+        self.is_scatter = np.array([s.is_scatter for s in symbols], dtype=bool)
+
+        # Koluti: za vsak stop vnaprej izrežemo stolpec višine okna.
+        reel_sets = state.reel_sets
+        self.width: int = len(reel_sets[0].reels)
+        self.reel_lengths = np.array([[reel.count for reel in rs.reels] for rs in reel_sets], dtype=np.int64)
+        max_len = int(self.reel_lengths.max())
+        self.columns = np.zeros((len(reel_sets), self.width, max_len, self.height), dtype=np.int16)
+        for r, rs in enumerate(reel_sets):
+            for c, reel in enumerate(rs.reels):
+                for stop in range(reel.count):
+                    self.columns[r, c, stop] = [self.symbol_codes[s.name] for s in reel.get_symbols(stop, self.height)]
+        weights = np.array([rs.weight for rs in reel_sets], dtype=np.float64)
+        self.reel_set_probs = weights / weights.sum()
+        self.reel_set_sampler: AliasSampler = AliasSampler(weights.tolist())
+        self.reel_set_cdf = np.cumsum(self.reel_set_probs)
+
+        # Linije in tabela izplačil: line_pay[simbol, število zaporednih].
+        self.payline_rows = np.array([p.positions[:self.width] for p in state.paylines], dtype=np.int64)
+        self.line_pay = np.zeros((len(self.symbol_names), self.width + 1), dtype=np.float64)
+        for (name, count), rule in state.paytable.rules.items():
+            code = self.symbol_codes.get(name)
+            if code is not None and count <= self.width and not self.is_scatter[code]:
+                self.line_pay[code, count] = rule.get("payout", 0)
+
+        # Scatterji: izplačilo in število podeljenih vrtljajev glede na število na oknu.
+        cells = self.width * self.height
+        self.scatter_codes: list[int] = [i for i, flag in enumerate(self.is_scatter) if flag]
+        self.scatter_pay = np.zeros((len(self.scatter_codes), cells + 1), dtype=np.float64)
+        self.scatter_trigger = np.zeros((len(self.scatter_codes), cells + 1), dtype=np.int64)
+        self.scatter_has_trigger = np.zeros((len(self.scatter_codes), cells + 1), dtype=bool)
+        for i, code in enumerate(self.scatter_codes):
+            for count in range(cells + 1):
+                rule = state.paytable.get_rule(self.symbol_names[code], count)
+                if not rule:
+                    continue
+                self.scatter_pay[i, count] = rule.get("payout", 0)
+                if "triggers" in rule:
+                    self.scatter_has_trigger[i, count] = True
+                    self.scatter_trigger[i, count] = rule["triggers"].get("count", 0)
+
+        # Collection (CP simboli): vrednosti se žrebajo posebej za vsako celico.
+        params = state.custom_parameters
+        self.bonus_symbol: str | None = params.get("bonusSymbol", None)
+        self.threshold: int = params.get("threshold", 0)
+        cp_weights = params.get("CPWeights", {})
+        self.cp_labels: list[str] = list(cp_weights.keys())
+        self.cp_values = np.array([float(label) for label in self.cp_labels], dtype=np.float64)
+        cp_w = np.array(list(cp_weights.values()), dtype=np.float64)
+        self.cp_probs = cp_w / cp_w.sum() if cp_weights else cp_w
+        self.cp_sampler: AliasSampler | None = AliasSampler(cp_w.tolist()) if cp_weights else None
+        self.cp_cdf = np.cumsum(self.cp_probs)
+        self.bonus_code: int = self.symbol_codes.get(self.bonus_symbol, -1) if cp_weights else -1
+        if self.bonus_code >= 0:
+            # CP simboli nosijo vrednost v vzporedni tabeli okna in na linijah ne plačujejo.
+            self.line_pay[self.bonus_code, :] = 0.0
+
+        # Tabela linijskih zmag: ključ linije = sum(koda[c] * B**c), B = število simbolov.
+        self.line_key_powers = len(self.symbol_names) ** np.arange(self.width, dtype=np.int64)
+        self.line_lut = self.build_line_lut() if len(self.symbol_names) ** self.width <= LINE_LUT_LIMIT else None
+
+    def line_run(self, lines: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Prvi simbol in dolžina zaporedja (z WILD) za linije oblike (..., širina)."""
+        first = lines[..., 0]
+        match = (lines == first[..., None]) | self.is_wild[lines]
+        return first, np.cumprod(match, axis=-1).sum(axis=-1)
+
+    def build_line_lut(self) -> np.ndarray:
+        """Osnovno izplačilo za vsako možno zaporedje simbolov na liniji."""
+        keys = np.arange(len(self.symbol_names) ** self.width, dtype=np.int64)
+        lines = (keys[:, None] // self.line_key_powers) % len(self.symbol_names)
+        first, run = self.line_run(lines)
+        return self.line_pay[first, run]
+
+
+class BatchResult:
+    """Rezultati N neodvisnih vrtljajev v enem stanju igre."""
+    def __init__(self, tables: BatchTables, bet: float, reel_set_index: np.ndarray, stops: np.ndarray,
+                 windows: np.ndarray, cp_index: np.ndarray) -> None:
+        self.tables: BatchTables = tables
+        self.bet: float = bet
+        self.reel_set_index = reel_set_index
+        self.stops = stops
+        self.windows = windows
+        self.cp_index = cp_index
+        self._evaluate()
+
+    def _evaluate(self) -> None:
+        t = self.tables
+        n = self.windows.shape[0]
+        num_paylines = len(t.payline_rows)
+
+        # Linije: simboli po linijah (N, L, W); izplačilo prek tabele linijskih zmag.
+        lines = self.windows[:, t.payline_rows, np.arange(t.width)]
+        self.line_first = lines[:, :, 0]
+        if t.line_lut is not None:
+            base_pay = t.line_lut[lines @ t.line_key_powers]
+        else:
+            first, run = t.line_run(lines)
+            base_pay = t.line_pay[first, run]
+        self.line_payouts = (base_pay * self.bet) / num_paylines
+
+        # Seštevamo v istem vrstnem redu kot skalarni scanMatrix, da se rezultati ujemajo do bita.
+        totals = np.zeros(n, dtype=np.float64)
+        for j in range(num_paylines):
+            totals += self.line_payouts[:, j]
+
+        scatter_payout = np.zeros(n, dtype=np.float64)
+        self.trigger_spins = np.zeros(n, dtype=np.int64)
+        self.triggered = np.zeros(n, dtype=bool)
+        self.scatter_counts = np.zeros((n, len(t.scatter_codes)), dtype=np.int64)
+        for i, code in enumerate(t.scatter_codes):
+            counts = (self.windows == code).sum(axis=(1, 2))
+            self.scatter_counts[:, i] = counts
+            scatter_payout += t.scatter_pay[i, counts]
+            hit = t.scatter_has_trigger[i, counts]
+            self.trigger_spins = np.where(hit, t.scatter_trigger[i, counts], self.trigger_spins)
+            self.triggered |= hit
+        self.scatter_payouts = scatter_payout * self.bet
+        totals += self.scatter_payouts
+
+        self.cp_counts = (self.cp_index >= 0).sum(axis=(1, 2))
+        cp_values = np.where(self.cp_index >= 0, t.cp_values[self.cp_index] if len(t.cp_values) else 0.0, 0.0)
+        cp_sum = np.zeros(n, dtype=np.float64)
+        for c in range(t.width):
+            for r in range(t.height):
+                cp_sum += cp_values[:, r, c]
+        self.cp_sums = cp_sum
+        collected = (self.cp_counts >= t.threshold) & (t.threshold > 0)
+        self.collected = collected
+        self.collection_payouts = np.where(collected, cp_sum * self.bet, 0.0)
+        totals += self.collection_payouts
+        self.totals = totals
+
+    def __len__(self) -> int:
+        return self.windows.shape[0]
+
+    def symbol_payouts(self) -> dict[str, float]:
+        """Vsota izplačil po simbolih (enako kot wins_by_symbol v spin_machine)."""
+        t = self.tables
+        sums = np.bincount(self.line_first.ravel(), weights=self.line_payouts.ravel(),
+                           minlength=len(t.symbol_names))
+        for i, code in enumerate(t.scatter_codes):
+            sums[code] += (t.scatter_pay[i, self.scatter_counts[:, i]] * self.bet).sum()
+        if t.bonus_code >= 0:
+            sums[t.bonus_code] += self.collection_payouts.sum()
+        return {name: float(sums[i]) for i, name in enumerate(t.symbol_names)}
+
+    def symbol_window(self, index: int) -> SymbolWindow:
+        """Zgradi SymbolWindow za i-ti vrtljaj, enak tistemu iz skalarnega getSymbolWindow."""
+        t = self.tables
+        window = SymbolWindow(t.width, t.height)
+        for col in range(t.width):
+            window.set_column(col, tuple(t.symbols[int(code)] for code in self.windows[index, :, col]))
+            for row in range(t.height):
+                cp = int(self.cp_index[index, row, col])
+                if cp >= 0:
+                    window.set_cp_value(row, col, t.cp_labels[cp], float(t.cp_values[cp]))
+        return window
+
+
+def spin_batch(tables: BatchTables, n: int, bet: float, rng: np.random.Generator,
+               reel_set_index: np.ndarray | None = None) -> BatchResult:
+    """
+    Vse pozicije ustavitve in CP vrednosti za N vrtljajev izžreba naenkrat.
+    Podan `reel_set_index` določi set kolutov za vsak vrtljaj (stratificirano vzorčenje).
+    """
+    if reel_set_index is None:
+        reel_set_index = tables.reel_set_sampler.sample_batch(rng, n)
+    stops = rng.integers(0, tables.reel_lengths[reel_set_index])
+    cols = np.arange(tables.width)
+    windows = tables.columns[reel_set_index[:, None], cols[None, :], stops].transpose(0, 2, 1)
+
+    cp_index = np.full(windows.shape, -1, dtype=np.int64)
+    if tables.bonus_code >= 0:
+        mask = windows == tables.bonus_code
+        cp_index[mask] = tables.cp_sampler.sample_batch(rng, int(mask.sum()))
+    return BatchResult(tables, bet, reel_set_index, stops, windows, cp_index)
+
+
+def windows_from_uniforms(tables: BatchTables, u_reel_set: np.ndarray,
+                          u_stops: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Set kolutov, pozicije ustavitve in okna iz danih enakomernih števil (inverzna porazdelitvena funkcija).
+    Z istimi števili se različice modela vrtijo na skupnih naključnih številih (common random numbers).
+    """
+    reel_set_index = np.minimum(np.searchsorted(tables.reel_set_cdf, u_reel_set, side="right"),
+                                len(tables.reel_set_cdf) - 1)
+    stops = (u_stops * tables.reel_lengths[reel_set_index]).astype(np.int64)
+    cols = np.arange(tables.width)
+    windows = tables.columns[reel_set_index[:, None], cols[None, :], stops].transpose(0, 2, 1)
+    return reel_set_index, stops, windows
+
+def cp_index_from_uniforms(tables: BatchTables, windows: np.ndarray, u_cp: np.ndarray) -> np.ndarray:
+    """CP vrednosti iz danih enakomernih števil (eno število na celico okna)."""
+    cp_index = np.full(windows.shape, -1, dtype=np.int64)
+    if tables.bonus_code >= 0:
+        mask = windows == tables.bonus_code
+        cp_index[mask] = np.minimum(np.searchsorted(tables.cp_cdf, u_cp[mask], side="right"),
+                                    len(tables.cp_cdf) - 1)
+    return cp_index
+
+
+class GameBatchResult:
+    """Rezultati N celotnih iger (osnovni vrtljaj in morebitni brezplačni vrtljaji)."""
+    def __init__(self, base: BatchResult, freespins: BatchResult | None, game_index: np.ndarray) -> None:
+        self.base: BatchResult = base
+        self.freespins: BatchResult | None = freespins
+        self.game_index = game_index
+        n = len(base)
+        self.base_payouts = base.totals
+        if freespins is not None and len(freespins):
+            self.bonus_payouts = np.bincount(game_index, weights=freespins.totals, minlength=n)
+            self.freespins_played = np.bincount(game_index, minlength=n)
+        else:
+            self.bonus_payouts = np.zeros(n, dtype=np.float64)
+            self.freespins_played = np.zeros(n, dtype=np.int64)
+        self.totals = self.base_payouts + self.bonus_payouts
+        self.triggered = base.triggered
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def symbol_payouts(self) -> dict[str, float]:
+        result = self.base.symbol_payouts()
+        if self.freespins is not None and len(self.freespins):
+            for name, value in self.freespins.symbol_payouts().items():
+                if name in result:
+                    result[name] += value
+        return result
@@ -0,0 +1,261 @@
+import os
+import time
+import json
+import pickle
+import hashlib
+import importlib
+from Classes.gameModel import GameModel
+
+# Mapa s prevedenimi modeli (pickle), ključ je zgoščena vrednost vsebine configa.
+CACHE_DIR = "cache"
+# Povečaj ob spremembi oblike predpomnilnika; spremembe razredov modela zazna že MODEL_MODULES.
+MODEL_CACHE_VERSION = 1
+# Moduli z razredi v prevedenem modelu; zgoščena vrednost njihove kode je del ključa predpomnilnika.
+MODEL_MODULES = ("Classes.gameModel", "Classes.batchSpin", "Classes.aliasSampler", "Classes.symbol",
+                 "Classes.symbolWindow", "Classes.reel", "Classes.reelSet", "Classes.payline", "Classes.paytable")
+# Kako pogosto (v sekundah) ConfigWatcher preveri čas spremembe datoteke.
+RELOAD_INTERVAL = 1.0
+REQUIRED_STATE_KEYS = ("symbols", "reel_sets", "paylines", "paytable", "window_height")
+
+
+class ConfigError(ValueError):
+    """Neveljaven config; `errors` vsebuje vse najdene napake, ne le prve."""
+    def __init__(self, errors: list[str], path: str | None = None) -> None:
+        self.errors: list[str] = errors
+        where = f" ({path})" if path else ""
+        super().__init__(f"Neveljaven config{where}:\n" + "\n".join(f"  - {e}" for e in errors))
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _validate_state(name: str, state: dict, state_names: set) -> list[str]:
+    errors = []
+    missing = [key for key in REQUIRED_STATE_KEYS if key not in state]
+    if missing:
+        return [f"{name}: manjkajo ključi {missing}"]
+
+    symbols = state["symbols"]
+    height = state["window_height"]
+    if not isinstance(symbols, dict) or not symbols:
+        errors.append(f"{name}.symbols: pričakovan neprazen slovar simbolov")
+        symbols = {}
+    for symbol, props in symbols.items():
+        if not isinstance(props, dict):
+            errors.append(f"{name}.symbols.{symbol}: lastnosti simbola morajo biti slovar")
+    if not isinstance(height, int) or isinstance(height, bool) or height < 1:
+        errors.append(f"{name}.window_height: pričakovano pozitivno celo število, ne {height!r}")
+        height = None
+
+    reel_sets = state["reel_sets"]
+    if not isinstance(reel_sets, list):
+        errors.append(f"{name}.reel_sets: pričakovan seznam setov kolutov")
+        reel_sets = []
+    reel_counts = set()
+    total_weight = 0
+    for i, rs in enumerate(reel_sets):
+        where = f"{name}.reel_sets[{i}]"
+        if not isinstance(rs, dict):
+            errors.append(f"{where}: set kolutov mora biti slovar z 'weight' in 'reels'")
+            continue
+        weight = rs.get("weight")
+        if not _is_number(weight) or weight < 0:
+            errors.append(f"{where}.weight: pričakovana nenegativna utež, ne {weight!r}")
+        else:
+            total_weight += weight
+        reels = rs.get("reels")
+        if not isinstance(reels, list) or not reels:
+            errors.append(f"{where}.reels: pričakovan neprazen seznam kolutov")
+            continue
+        reel_counts.add(len(reels))
+        for j, reel in enumerate(reels):
+            if not isinstance(reel, list) or not reel:
+                errors.append(f"{where}.reels[{j}]: kolut mora biti neprazen seznam simbolov")
+                continue
+            unknown = sorted({str(s) for s in reel if not isinstance(s, str) or s not in symbols})
+            if unknown:
+                errors.append(f"{where}.reels[{j}]: neznani simboli {unknown}")
+    if not reel_sets or total_weight <= 0:
+        errors.append(f"{name}.reel_sets: vsota uteži setov kolutov mora biti pozitivna")
+    if len(reel_counts) > 1:
+        errors.append(f"{name}.reel_sets: seti imajo različno število kolutov {sorted(reel_counts)}")
+    width = reel_counts.pop() if len(reel_counts) == 1 else None
+
+    paylines = state["paylines"]
+    if not isinstance(paylines, list):
+        errors.append(f"{name}.paylines: pričakovan seznam linij")
+        paylines = []
+    for i, line in enumerate(paylines):
+        where = f"{name}.paylines[{i}]"
+        if not isinstance(line, list):
+            errors.append(f"{where}: linija mora biti seznam vrstic, ne {line!r}")
+            continue
+        if width is not None and len(line) != width:
+            errors.append(f"{where}: dolžina {len(line)}, koluti pa {width}")
+        if height is not None and any(not isinstance(row, int) or not 0 <= row < height for row in line):
+            errors.append(f"{where}: vrstice morajo biti med 0 in {height - 1}, ne {line}")
+
+    paytable = state["paytable"]
+    if not isinstance(paytable, dict):
+        errors.append(f"{name}.paytable: pričakovan slovar izplačil po simbolih")
+        paytable = {}
+    for symbol, rules in paytable.items():
+        where = f"{name}.paytable.{symbol}"
+        if symbol not in symbols:
+            errors.append(f"{where}: simbol ni definiran v {name}.symbols")
+        if not isinstance(rules, dict):
+            errors.append(f"{where}: pričakovan slovar pravil po številu zadetkov")
+            continue
+        for count, rule in rules.items():
+            if not str(count).isdigit() or int(count) < 1:
+                errors.append(f"{where}: število zadetkov mora biti pozitivno celo število, ne {count!r}")
+            if _is_number(rule):
+                continue
+            if not isinstance(rule, dict):
+                errors.append(f"{where}.{count}: pravilo mora biti število ali slovar")
+                continue
+            if "payout" in rule and not _is_number(rule["payout"]):
+                errors.append(f"{where}.{count}.payout: pričakovano število")
+            trigger = rule.get("triggers")
+            if trigger is None:
+                continue
+            if not isinstance(trigger, dict):
+                errors.append(f"{where}.{count}.triggers: pričakovan slovar z 'name' in 'count'")
+                continue
+            if trigger.get("name") not in state_names:
+                errors.append(f"{where}.{count}.triggers: stanje {trigger.get('name')!r} ne obstaja")
+            spins = trigger.get("count")
+            if not isinstance(spins, int) or isinstance(spins, bool) or spins < 1:
+                errors.append(f"{where}.{count}.triggers.count: pričakovano pozitivno celo število")
+
+    custom = state.get("customParameters", {})
+    if not isinstance(custom, dict):
+        errors.append(f"{name}.customParameters: pričakovan slovar")
+        return errors
+    cp_weights = custom.get("CPWeights", {})
+    if not isinstance(cp_weights, dict):
+        errors.append(f"{name}.customParameters.CPWeights: pričakovan slovar vrednost -> utež")
+        cp_weights = {}
+    if cp_weights:
+        if custom.get("bonusSymbol") not in symbols:
+            errors.append(f"{name}.customParameters.bonusSymbol: simbol {custom.get('bonusSymbol')!r} ne obstaja")
+        for label, weight in cp_weights.items():
+            try:
+                float(label)
+            except ValueError:
+                errors.append(f"{name}.customParameters.CPWeights: vrednost {label!r} ni število")
+            if not _is_number(weight) or weight < 0:
+                errors.append(f"{name}.customParameters.CPWeights.{label}: pričakovana nenegativna utež")
+        if sum(w for w in cp_weights.values() if _is_number(w)) <= 0:
+            errors.append(f"{name}.customParameters.CPWeights: vsota uteži mora biti pozitivna")
+    threshold = custom.get("threshold", 0)
+    if not _is_number(threshold) or threshold < 0:
+        errors.append(f"{name}.customParameters.threshold: pričakovano nenegativno število")
+    return errors
+
+def validate_config(config: dict) -> list[str]:
+    """Preveri strukturo in navzkrižne reference configa; vrne seznam napak (prazen, če je config veljaven)."""
+    if not isinstance(config, dict) or "base" not in config:
+        return ["config mora biti slovar stanj z vsaj stanjem 'base'"]
+    errors = []
+    for name, state in config.items():
+        if not isinstance(state, dict):
+            errors.append(f"{name}: stanje mora biti slovar")
+            continue
+        errors.extend(_validate_state(name, state, set(config)))
+    return errors
+
+def _model_source_digest() -> bytes:
+    digest = hashlib.sha256()
+    for name in MODEL_MODULES:
+        with open(importlib.import_module(name).__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+_MODEL_SOURCE_DIGEST = _model_source_digest()
+
+def config_digest(raw: bytes) -> str:
+    return hashlib.sha256(raw + f"|model-v{MODEL_CACHE_VERSION}|".encode() + _MODEL_SOURCE_DIGEST).hexdigest()[:16]
+
+def load_config(path: str = "config.json") -> tuple[dict, str]:
+    """Prebere in preveri config; vrne (config, zgoščena vrednost vsebine). Ob napakah sproži ConfigError."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        config = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ConfigError([f"neveljaven JSON: {e}"], path) from e
+    errors = validate_config(config)
+    if errors:
+        raise ConfigError(errors, path)
+    return config, config_digest(raw)
+
+def load_model(path: str = "config.json", cache_dir: str | None = CACHE_DIR) -> tuple[dict, GameModel, str]:
+    """
+    Preverjen config in preveden model. Model se shrani v cache_dir/model_<hash>.pkl,
+    zato ga naslednji procesi z enako vsebino configa le naložijo (brez ponovnega prevajanja).
+    """
+    config, digest = load_config(path)
+    cache_path = os.path.join(cache_dir, f"model_{digest}.pkl") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        # Pokvarjen ali nezdružljiv predpomnilnik (npr. iz druge različice NumPy) se ne uporabi, model se prevede znova.
+        try:
+            with open(cache_path, "rb") as f:
+                model = pickle.load(f)
+            if isinstance(model, GameModel):
+                return config, model, digest
+        except Exception:
+            pass
+
+    model = GameModel.from_config(config)
+    for state in model.states.values():
+        state.get_batch_tables()
+    if cache_path:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        # Zapis prek začasne datoteke, da sočasni procesi nikoli ne preberejo polovičnega modela.
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return config, model, digest
+
+
+class ConfigWatcher:
+    """
+    Sprotno ponovno nalaganje configa v dolgo živečih procesih.
+    poll() največ enkrat na RELOAD_INTERVAL preveri čas spremembe datoteke; ob spremembi naloži
+    in preveri novi config. Neveljaven config se zavrne in ostane prejšnji model.
+    """
+    def __init__(self, path: str = "config.json", cache_dir: str | None = CACHE_DIR,
+                 interval: float = RELOAD_INTERVAL) -> None:
+        self.path: str = path
+        self.cache_dir: str | None = cache_dir
+        self.interval: float = interval
+        self.config, self.model, self.digest = load_model(path, cache_dir)
+        self._mtime: int = os.stat(path).st_mtime_ns
+        self._next_check: float = time.monotonic() + interval
+
+    def poll(self) -> bool:
+        """Vrne True, če je bil naložen nov model."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            config, model, digest = load_model(self.path, self.cache_dir)
+        except (ConfigError, OSError) as e:
+            print(f"Opozorilo: config ni bil ponovno naložen, ostaja prejšnji. {e}")
+            return False
+        if digest == self.digest:
+            return False
+        self.config, self.model, self.digest = config, model, digest
+        print(f"Config ponovno naložen ({self.path}, {digest}).")
+        return True
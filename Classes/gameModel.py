@@ -0,0 +1,113 @@
+from Classes.symbol import Symbol
+from Classes.reel import Reel
+from Classes.reelSet import ReelSet
+from Classes.payline import Payline
+from Classes.paytable import Paytable
+from Classes.batchSpin import BatchTables
+from Classes.aliasSampler import AliasSampler
+
+
+def load_symbols(data: dict) -> dict[str, Symbol]:
+    symbols = {}
+    for code, (name, props) in enumerate(data.items()):
+        symbols[name] = Symbol(
+            name,
+            is_wild=props.get("is_wild", False),
+            is_scatter=props.get("is_scatter", False),
+            code=code
+        )
+    return symbols
+
+def load_reel_sets(data: list, symbols: dict[str, Symbol]) -> list[ReelSet]:
+    reel_sets = []
+    for rs in data:
+        reels = []
+        for reel_symbols in rs["reels"]:
+            reels.append(Reel([symbols[s] for s in reel_symbols]))
+        reel_sets.append(ReelSet(reels=reels, weight=rs["weight"]))
+    return reel_sets
+
+def load_paylines(data: list) -> list[Payline]:
+    return [Payline(p) for p in data]
+
+def load_paytable(data: dict) -> Paytable:
+    paytable = Paytable()
+    for symbol, rules in data.items():
+        for count_str, rule_info in rules.items():
+            count = int(count_str)
+            if isinstance(rule_info, (int, float)):
+                paytable.add_rule(symbol, count, {"payout": rule_info})
+            elif isinstance(rule_info, dict):
+                paytable.add_rule(symbol, count, rule_info)
+    return paytable
+
+
+class GameState:
+    """
+    Prevedeno stanje igre ("base", "freespins", ...).
+    Zgradi se enkrat ob nalaganju modela in se med vrtljaji ne spreminja.
+    """
+    def __init__(self, name: str, symbols: dict[str, Symbol], reel_sets: list[ReelSet],
+                 paylines: list[Payline], paytable: Paytable, window_height: int,
+                 custom_parameters: dict) -> None:
+        self.name: str = name
+        self.symbols: dict[str, Symbol] = symbols
+        self.reel_sets: tuple[ReelSet, ...] = tuple(reel_sets)
+        self.paylines: tuple[Payline, ...] = tuple(paylines)
+        self.paytable: Paytable = paytable
+        self.window_height: int = window_height
+        self.custom_parameters: dict = custom_parameters
+        self._batch_tables: BatchTables | None = None
+        for reel_set in self.reel_sets:
+            for col, reel in enumerate(reel_set.reels):
+                reel.precompute_windows(window_height, len(symbols) ** col)
+            for payline in self.paylines:
+                payline.get_cell_indices(len(reel_set.reels), window_height)
+        # Tabela linijskih zmag kot navaden seznam (hitrejše posamezno branje kot numpy).
+        lut = self.get_batch_tables().line_lut if self.reel_sets else None
+        self.line_lut: list[float] | None = lut.tolist() if lut is not None else None
+
+        # Alias tabele za uteženo žrebanje seta kolutov in CP vrednosti (namesto random.choices ob vsakem klicu).
+        self.reel_set_sampler: AliasSampler | None = (
+            AliasSampler([rs.weight for rs in self.reel_sets]) if self.reel_sets else None
+        )
+        cp_weights = custom_parameters.get("CPWeights", {})
+        self.bonus_symbol: str | None = custom_parameters.get("bonusSymbol", None) if cp_weights else None
+        self.cp_labels: list[str] = list(cp_weights.keys())
+        self.cp_values: list[float] = [float(label) for label in self.cp_labels]
+        self.cp_sampler: AliasSampler | None = AliasSampler(list(cp_weights.values())) if cp_weights else None
+
+    def get_batch_tables(self) -> BatchTables:
+        """Celoštevilske tabele za vektorizirano vrtenje (zgradijo se ob prvi uporabi)."""
+        if self._batch_tables is None:
+            self._batch_tables = BatchTables(self)
+        return self._batch_tables
+
+    @classmethod
+    def from_config(cls, name: str, data: dict) -> "GameState":
+        symbols = load_symbols(data["symbols"])
+        return cls(
+            name=name,
+            symbols=symbols,
+            reel_sets=load_reel_sets(data["reel_sets"], symbols),
+            paylines=load_paylines(data["paylines"]),
+            paytable=load_paytable(data["paytable"]),
+            window_height=data["window_height"],
+            custom_parameters=data.get("customParameters", {})
+        )
+
+
+class GameModel:
+    """Celoten matematični model igre, preveden iz config.json (eno stanje na ključ)."""
+    def __init__(self, states: dict[str, GameState]) -> None:
+        self.states: dict[str, GameState] = states
+
+    @classmethod
+    def from_config(cls, config: dict) -> "GameModel":
+        return cls({name: GameState.from_config(name, data) for name, data in config.items()})
+
+    def get_state(self, name: str) -> GameState:
+        return self.states[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.states
@@ -1,6 +1,11 @@
+from operator import itemgetter
+
 class Payline: 
   def __init__(self, positions: list[int]) -> None:
     self.positions: list[int] = positions
+    self.cell_indices: tuple[int, ...] = ()
+    self.window_height: int = 0
+    self.key_getter = None
     
   def get_symbol_positions(self, matrix: list[list]) -> list:
     symbols = []
@@ -10,6 +15,24 @@ class Payline:
         break
       symbols.append(matrix[row_index][col_index])
     return symbols
+
+  def get_cell_indices(self, width: int, height: int) -> tuple[int, ...]:
+    """Ploski indeksi celic linije v SymbolWindow (po stolpcih)."""
+    if self.window_height != height or len(self.cell_indices) != min(width, len(self.positions)):
+      self.cell_indices = tuple(col * height + row for col, row in enumerate(self.positions[:width]))
+      self.window_height = height
+      # Vrne prispevke celic linije h ključu tabele linijskih zmag (vedno kot terko).
+      if len(self.cell_indices) > 1:
+        self.key_getter = itemgetter(*self.cell_indices)
+      else:
+        self.key_getter = lambda keys, i=self.cell_indices[0]: (keys[i],)
+    return self.cell_indices
+
+  def get_window_symbols(self, window) -> list:
+    """Simboli na liniji, prebrani neposredno iz ploske tabele okna (brez gradnje matrike)."""
+    cells = window.symbols
+    return [cells[i] for i in self.get_cell_indices(window.width, window.height)]
+
   def is_winning_line(self, reels: list[list[str]], win_condition) -> bool:
     symbols = self.get_symbol_positions(reels)
     return win_condition(symbols)
\ No newline at end of file
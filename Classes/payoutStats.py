@@ -0,0 +1,172 @@
+import math
+from bisect import bisect_left
+import numpy as np
+
+# Meje pasov dobitkov v večkratnikih stave: 0x, (0-1x], (1-5x], ..., nad 1000x.
+WIN_BANDS = [0, 1, 5, 10, 20, 50, 100, 250, 500, 1000]
+WIN_BAND_LABELS = ["0x"] + [f"{lo}-{hi}x" for lo, hi in zip(WIN_BANDS, WIN_BANDS[1:])] + [f"{WIN_BANDS[-1]}x+"]
+# Indeks volatilnosti = z * standardni odklon (95% zaupanje, enako kot interval zaupanja za RTP).
+VOLATILITY_Z = 1.96
+
+
+class PayoutStats:
+    """
+    Sprotna statistika multiplikatorjev izplačil (izplačilo / stava).
+    Centralni momenti do 4. reda se posodabljajo po Welfordu in združujejo po Chan/Pébay formulah,
+    zato je združevanje delnih rezultatov (delovni procesi, nadaljevani teki) asociativno in numerično stabilno.
+    """
+    def __init__(self) -> None:
+        self.n: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+        self.m3: float = 0.0
+        self.m4: float = 0.0
+        self.max: float = 0.0
+        self.band_counts: list[int] = [0] * len(WIN_BAND_LABELS)
+
+    def add(self, x: float) -> None:
+        n1 = self.n
+        self.n += 1
+        n = self.n
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+        if x > self.max:
+            self.max = x
+        self.band_counts[bisect_left(WIN_BANDS, x)] += 1
+
+    def add_batch(self, values: np.ndarray) -> None:
+        """Doda celo tabelo vrednosti naenkrat (momenti paketa + združitev)."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        batch = PayoutStats()
+        batch.n = len(values)
+        batch.mean = float(values.mean())
+        d = values - batch.mean
+        d2 = d * d
+        batch.m2 = float(d2.sum())
+        batch.m3 = float((d2 * d).sum())
+        batch.m4 = float((d2 * d2).sum())
+        batch.max = float(values.max())
+        bands = np.searchsorted(WIN_BANDS, values, side="left")
+        batch.band_counts = np.bincount(bands, minlength=len(WIN_BAND_LABELS)).tolist()
+        self.merge(batch)
+
+    def merge(self, other: "PayoutStats") -> "PayoutStats":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = other.n, other.mean, other.m2, other.m3, other.m4
+            self.max = other.max
+            self.band_counts = list(other.band_counts)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta * delta2 * na * nb * (na - nb) / (n * n)
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / (n ** 3)
+              + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / (n * n)
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.mean += delta * nb / n
+        self.n, self.m2, self.m3, self.m4 = n, m2, m3, m4
+        self.max = max(self.max, other.max)
+        self.band_counts = [a + b for a, b in zip(self.band_counts, other.band_counts)]
+        return self
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def skewness(self) -> float:
+        return math.sqrt(self.n) * self.m3 / self.m2 ** 1.5 if self.m2 > 0 else 0.0
+
+    @property
+    def excess_kurtosis(self) -> float:
+        return self.n * self.m4 / (self.m2 * self.m2) - 3.0 if self.m2 > 0 else 0.0
+
+    @property
+    def volatility_index(self) -> float:
+        return VOLATILITY_Z * self.std_dev
+
+    def band_probabilities(self) -> dict[str, float]:
+        return {label: count / self.n if self.n else 0.0 for label, count in zip(WIN_BAND_LABELS, self.band_counts)}
+
+    def to_dict(self) -> dict:
+        return {
+            "n": self.n, "mean": self.mean, "m2": self.m2, "m3": self.m3, "m4": self.m4,
+            "max": self.max, "band_counts": self.band_counts
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict | None) -> "PayoutStats":
+        stats = cls()
+        if data:
+            stats.n, stats.mean = data["n"], data["mean"]
+            stats.m2, stats.m3, stats.m4 = data["m2"], data["m3"], data["m4"]
+            stats.max = data.get("max", 0.0)
+            stats.band_counts = list(data["band_counts"])
+        return stats
+
+
+class CovarianceStats:
+    """
+    Sprotno povprečje in ko-momentna matrika več spremenljivk (npr. izplačilo in kontrolne spremenljivke).
+    Združevanje po Chanu: C = Ca + Cb + delta delta^T * na * nb / n.
+    """
+    def __init__(self, dim: int) -> None:
+        self.n: int = 0
+        self.mean = np.zeros(dim)
+        self.comoment = np.zeros((dim, dim))
+
+    def add_batch(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        batch = CovarianceStats(values.shape[1])
+        batch.n = len(values)
+        batch.mean = values.mean(axis=0)
+        d = values - batch.mean
+        batch.comoment = d.T @ d
+        self.merge(batch)
+
+    def merge(self, other: "CovarianceStats") -> "CovarianceStats":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.comoment = other.n, other.mean.copy(), other.comoment.copy()
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def covariance(self) -> np.ndarray:
+        return self.comoment / (self.n - 1) if self.n > 1 else np.zeros_like(self.comoment)
+
+    def to_dict(self) -> dict:
+        return {"n": self.n, "mean": self.mean.tolist(), "comoment": self.comoment.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CovarianceStats":
+        stats = cls(len(data["mean"]))
+        stats.n = data["n"]
+        stats.mean = np.array(data["mean"], dtype=np.float64)
+        stats.comoment = np.array(data["comoment"], dtype=np.float64)
+        return stats
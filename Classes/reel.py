@@ -3,10 +3,28 @@ class Reel:
   def __init__(self, symbols: list[Symbol]) -> None:
     self.symbols: list[Symbol] = symbols
     self.count: int = len(symbols)
+    self.windows: tuple[tuple[Symbol, ...], ...] = ()
+    self.window_keys: tuple[tuple[int, ...], ...] = ()
+    self.window_height: int = 0
     
   def get_symbols(self, stop_position: int, height: int) -> list[Symbol]:
     result = []
     for i in range(height):
       result.append(self.symbols[(stop_position + i) % self.count])
     return result
-  
\ No newline at end of file
+
+  def precompute_windows(self, height: int, key_multiplier: int | None = None) -> None:
+    """
+    Za vsak stop vnaprej izreže stolpec simbolov (deljene, nespremenljive terke).
+    Z key_multiplier (B**stolpec) pripravi še prispevke kod simbolov h ključu linije.
+    """
+    self.windows = tuple(tuple(self.get_symbols(stop, height)) for stop in range(self.count))
+    self.window_height = height
+    if key_multiplier is not None:
+      self.window_keys = tuple(tuple(s.code * key_multiplier for s in window) for window in self.windows)
+
+  def get_window(self, stop_position: int, height: int) -> tuple[Symbol, ...]:
+    if self.window_height != height:
+      self.precompute_windows(height)
+    return self.windows[stop_position]
+  
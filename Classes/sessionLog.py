@@ -0,0 +1,190 @@
+import json
+import os
+import struct
+
+# Glava zapisa v binarnem segmentu: dolžina JSON vsebine (uint32, little endian).
+RECORD_HEADER = struct.Struct("<I")
+SEGMENT_FORMATS = {"jsonl": ".jsonl", "binary": ".bin"}
+
+
+class SessionSink:
+    """
+    Cilj za zapis sej iz spin_machine.
+    Če `enabled` ni nastavljen, spin_machine dnevnika vrtljajev sploh ne gradi.
+    """
+    enabled: bool = True
+
+    def write(self, session_data: dict) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class NullSink(SessionSink):
+    """Ne zapisuje ničesar (simulacije); spin_machine preskoči gradnjo dnevnika."""
+    enabled = False
+
+    def write(self, session_data: dict) -> None:
+        pass
+
+
+class JsonFileSink(SessionSink):
+    """Ena berljiva JSON datoteka na sejo (database/log_<id>.json), kot doslej."""
+    def __init__(self, directory: str = "database", verbose: bool = True) -> None:
+        self.directory: str = directory
+        self.verbose: bool = verbose
+
+    def write(self, session_data: dict) -> None:
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        filename = os.path.join(self.directory, f"log_{session_data['session_id'][:8]}.json")
+        with open(filename, "w", encoding='utf-8') as f:
+            json.dump(session_data, f, indent=2, ensure_ascii=False)
+        if self.verbose:
+            print(f"\nSeja shranjena v {filename}")
+
+
+class SegmentLogSink(SessionSink):
+    """
+    Zaporedni (append-only) dnevnik sej v segmentnih datotekah.
+    Vsak segment ima indeks <segment>.idx z vrsticami "session_id<TAB>odmik<TAB>dolžina",
+    fsync se izvede na vsakih `fsync_every` zapisov, ob menjavi segmenta in ob zaprtju.
+    Format "jsonl" zapiše eno sejo na vrstico, "binary" pa dolžino (uint32) in JSON vsebino.
+    """
+    def __init__(self, directory: str = os.path.join("database", "segments"), fmt: str = "jsonl",
+                 max_segment_bytes: int = 64 * 1024 * 1024, fsync_every: int = 1000) -> None:
+        if fmt not in SEGMENT_FORMATS:
+            raise ValueError(f"Neznan format segmenta: {fmt}")
+        self.directory: str = directory
+        self.fmt: str = fmt
+        self.max_segment_bytes: int = max_segment_bytes
+        self.fsync_every: int = fsync_every
+        self.pending: int = 0
+        self._file = None
+        self._index = None
+        os.makedirs(directory, exist_ok=True)
+        # Vsak zagon začne nov segment, da se ne pišemo za morebiten nedokončan zapis.
+        existing = list_segments(directory, fmt)
+        self.segment_number: int = segment_number(existing[-1]) if existing else 0
+        self._open_segment()
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment_{number:06d}{SEGMENT_FORMATS[self.fmt]}")
+
+    def _open_segment(self) -> None:
+        self.segment_number += 1
+        path = self._segment_path(self.segment_number)
+        self._file = open(path, "ab")
+        self._index = open(f"{path}.idx", "a", encoding='utf-8')
+        self.offset: int = self._file.tell()
+
+    def write(self, session_data: dict) -> None:
+        payload = json.dumps(session_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self.fmt == "binary":
+            record = RECORD_HEADER.pack(len(payload)) + payload
+            start = self.offset + RECORD_HEADER.size
+        else:
+            record = payload + b"\n"
+            start = self.offset
+        self._file.write(record)
+        self._index.write(f"{session_data['session_id']}\t{start}\t{len(payload)}\n")
+        self.offset += len(record)
+        self.pending += 1
+
+        if self.pending >= self.fsync_every:
+            self.flush()
+        if self.offset >= self.max_segment_bytes:
+            self.rotate()
+
+    def flush(self) -> None:
+        if self._file is None:
+            return
+        for f in (self._file, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = 0
+
+    def rotate(self) -> None:
+        """Zaključi trenutni segment in odpre naslednjega."""
+        self.close()
+        self._open_segment()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._index.close()
+        self._file = None
+        self._index = None
+
+
+def list_segments(directory: str, fmt: str = "jsonl") -> list[str]:
+    suffix = SEGMENT_FORMATS[fmt]
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.startswith("segment_") and n.endswith(suffix))
+    return [os.path.join(directory, n) for n in names]
+
+def segment_number(path: str) -> int:
+    return int(os.path.basename(path).split("_")[1].split(".")[0])
+
+
+class SegmentLogReader:
+    """Branje segmentnega dnevnika: zaporedno ali po session_id prek indeksov."""
+    def __init__(self, directory: str = os.path.join("database", "segments"), fmt: str = "jsonl") -> None:
+        self.directory: str = directory
+        self.fmt: str = fmt
+        self.index: dict[str, tuple[str, int, int]] = {}
+        for path in list_segments(directory, fmt):
+            if not os.path.exists(f"{path}.idx"):
+                continue
+            with open(f"{path}.idx", "r", encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 3:
+                        self.index[parts[0]] = (path, int(parts[1]), int(parts[2]))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.index
+
+    def get(self, session_id: str) -> dict | None:
+        entry = self.index.get(session_id)
+        if entry is None:
+            return None
+        path, start, length = entry
+        with open(path, "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(length).decode("utf-8"))
+
+    def __iter__(self):
+        """Vse seje v vrstnem redu zapisa (nedokončan zadnji zapis se preskoči)."""
+        for path in list_segments(self.directory, self.fmt):
+            with open(path, "rb") as f:
+                if self.fmt == "binary":
+                    while True:
+                        header = f.read(RECORD_HEADER.size)
+                        if len(header) < RECORD_HEADER.size:
+                            break
+                        (length,) = RECORD_HEADER.unpack(header)
+                        payload = f.read(length)
+                        if len(payload) < length:
+                            break
+                        yield json.loads(payload.decode("utf-8"))
+                else:
+                    for line in f:
+                        if line.endswith(b"\n"):
+                            yield json.loads(line.decode("utf-8"))
@@ -0,0 +1,114 @@
+from Classes.symbolWindow import SymbolWindow
+from Classes.spinWin import SpinWin
+
+
+def build_spin_log(spin_state: str, window: SymbolWindow, total: float, wins: list[SpinWin],
+                   bonus_trigger: dict | None) -> dict:
+    """Zapis enega vrtljaja za dnevnik seje (imena simbolov, zaokrožene zmage, pozicije)."""
+    return {
+        "state": spin_state,
+        "window": window.get_name_matrix(),
+        "payout": round(total, 2),
+        "wins": [
+            {
+                "type": w.type,
+                "symbols": window.get_line_names(w.positions) if w.type == "line" else [s.name if hasattr(s, 'name') else s for s in w.symbols],
+                "payout": round(w.payout, 2),
+                "positions": w.positions,
+                "triggers": w.triggers
+            } for w in wins
+        ],
+        "bonus_triggered": {
+            "name": bonus_trigger["name"],
+            "spins_awarded": bonus_trigger["count"]
+        } if bonus_trigger else None
+    }
+
+
+class SessionResult:
+    """
+    Rezultat ene seje iz spin_machine.
+    Zbirne vrednosti (total, base, bonus, wins_by_symbol) so izračunane takoj,
+    dnevnik vrtljajev (all_spins) in JSON oblika seje pa se zgradita šele ob prvem dostopu.
+    Podpira tudi dostop kot do slovarja (outcome["total"], outcome.get(...)).
+    """
+    KEYS = ("total", "base", "bonus", "all_spins", "wins_by_symbol", "bonus_triggered")
+
+    def __init__(self, session_id: str, timestamp: str, bet: float, wins_by_symbol: dict[str, float]) -> None:
+        self.session_id: str = session_id
+        self.timestamp: str = timestamp
+        self.bet: float = bet
+        self.total: float = 0.0
+        self.base: float = 0.0
+        self.bonus: float = 0.0
+        self.wins_by_symbol: dict[str, float] = wins_by_symbol
+        self.freespins_played: int = 0
+        self.bonus_triggered: bool = False
+        # Statistika funkcij: collection zmage (stanje, vsota CP).
+        self.cp_collections: list[tuple[str, float]] = []
+        # Surovi vrtljaji: (stanje, okno, izplačilo, zmage, trigger).
+        self.spin_records: list[tuple] = []
+        self._all_spins: list[dict] | None = None
+
+    def add_spin(self, spin_state: str, window: SymbolWindow, total: float, wins: list[SpinWin],
+                 bonus_trigger: dict | None) -> None:
+        if spin_state == "base":
+            self.base += total
+        else:
+            self.bonus += total
+            self.freespins_played += 1
+        self.total += total
+
+        wins_by_symbol = self.wins_by_symbol
+        for w in wins:
+            if w.type == "bonus_collection":
+                self.cp_collections.append((spin_state, w.payout / self.bet))
+            if w.symbols and len(w.symbols) > 0:
+                s = w.symbols[0]
+                sym_name = s.name if hasattr(s, 'name') else str(s)
+                if sym_name in wins_by_symbol:
+                    wins_by_symbol[sym_name] += w.payout
+
+        if bonus_trigger and spin_state == "base":
+            self.bonus_triggered = True
+        self.spin_records.append((spin_state, window, total, wins, bonus_trigger))
+        self._all_spins = None
+
+    def finish(self) -> None:
+        self.total = round(self.total, 4)
+        self.base = round(self.base, 4)
+        self.bonus = round(self.bonus, 4)
+
+    @property
+    def all_spins(self) -> list[dict]:
+        if self._all_spins is None:
+            self._all_spins = [build_spin_log(*record) for record in self.spin_records]
+        return self._all_spins
+
+    def to_dict(self) -> dict:
+        """Seja v obliki za dnevnik (enako kot database/log_<id>.json)."""
+        return {
+            "session_id": self.session_id,
+            "timestamp": self.timestamp,
+            "bet": self.bet,
+            "base_win": self.base,
+            "bonus_win": self.bonus,
+            "total_payout": self.total,
+            "spins": self.all_spins,
+            "wins_by_symbol": self.wins_by_symbol,
+            "total_freespins_played": self.freespins_played
+        }
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self.KEYS else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.KEYS
+
+    def keys(self) -> tuple:
+        return self.KEYS
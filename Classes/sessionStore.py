@@ -0,0 +1,214 @@
+import glob
+import json
+import os
+import sqlite3
+import sys
+from Classes.sessionLog import SessionSink
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    bet REAL NOT NULL,
+    base_win REAL NOT NULL,
+    bonus_win REAL NOT NULL,
+    total_payout REAL NOT NULL,
+    bonus_triggered INTEGER NOT NULL,
+    total_freespins_played INTEGER NOT NULL,
+    wins_by_symbol TEXT
+);
+CREATE TABLE IF NOT EXISTS spins (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id),
+    spin_index INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    window TEXT,
+    payout REAL NOT NULL,
+    bonus_name TEXT,
+    spins_awarded INTEGER,
+    PRIMARY KEY (session_id, spin_index)
+);
+CREATE TABLE IF NOT EXISTS wins (
+    session_id TEXT NOT NULL,
+    spin_index INTEGER NOT NULL,
+    win_index INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    symbols TEXT,
+    payout REAL NOT NULL,
+    positions TEXT,
+    triggers TEXT,
+    PRIMARY KEY (session_id, spin_index, win_index)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions(timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_total_payout ON sessions(total_payout);
+CREATE INDEX IF NOT EXISTS idx_sessions_bonus ON sessions(bonus_triggered, bonus_win);
+"""
+REQUIRED_KEYS = ("session_id", "timestamp", "bet", "base_win", "bonus_win", "total_payout")
+
+
+class SQLiteSessionStore(SessionSink):
+    """
+    Seje, vrtljaji in zmage v normaliziranih SQLite tabelah (WAL način).
+    Zapisi se zbirajo in shranijo v eni transakciji na vsakih `batch_size` sej.
+    """
+    def __init__(self, path: str = os.path.join("database", "sessions.db"), batch_size: int = 500) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self.pending: list[dict] = []
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def write(self, session_data: dict) -> None:
+        self.pending.append(session_data)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        sessions, spins, wins = [], [], []
+        for data in self.pending:
+            spin_logs = data.get("spins", [])
+            bonus_triggered = any(s.get("bonus_triggered") for s in spin_logs if s.get("state") == "base") \
+                or data.get("total_freespins_played", 0) > 0
+            sessions.append((
+                data["session_id"], data["timestamp"], data["bet"], data["base_win"], data["bonus_win"],
+                data["total_payout"], int(bonus_triggered), data.get("total_freespins_played", 0),
+                json.dumps(data.get("wins_by_symbol", {}))
+            ))
+            for i, spin in enumerate(spin_logs):
+                trigger = spin.get("bonus_triggered") or {}
+                spins.append((
+                    data["session_id"], i, spin["state"], json.dumps(spin.get("window")), spin["payout"],
+                    trigger.get("name"), trigger.get("spins_awarded")
+                ))
+                for j, win in enumerate(spin.get("wins", [])):
+                    wins.append((
+                        data["session_id"], i, j, win["type"], json.dumps(win.get("symbols")), win["payout"],
+                        json.dumps(win.get("positions")), win.get("triggers")
+                    ))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", sessions)
+            self.conn.executemany("INSERT OR REPLACE INTO spins VALUES (?, ?, ?, ?, ?, ?, ?)", spins)
+            self.conn.executemany("INSERT OR REPLACE INTO wins VALUES (?, ?, ?, ?, ?, ?, ?, ?)", wins)
+        self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    # --- Poizvedbe ---
+
+    def count(self) -> int:
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def find_sessions(self, since: str | None = None, until: str | None = None,
+                      min_payout: float | None = None, max_payout: float | None = None,
+                      min_multiplier: float | None = None, bonus_triggered: bool | None = None,
+                      min_bonus_multiplier: float | None = None, order_by: str = "timestamp",
+                      limit: int | None = None) -> list[dict]:
+        """
+        Povzetki sej, ki ustrezajo filtrom. Množitelji so glede na vložek seje,
+        npr. find_sessions(min_bonus_multiplier=100) vrne vse seje z bonus dobitkom nad 100x.
+        """
+        self.flush()
+        if order_by not in ("timestamp", "total_payout", "bonus_win"):
+            raise ValueError(f"Neveljaven stolpec za razvrščanje: {order_by}")
+        conditions, params = [], []
+        filters = [
+            ("timestamp >= ?", since), ("timestamp <= ?", until),
+            ("total_payout >= ?", min_payout), ("total_payout <= ?", max_payout),
+            ("total_payout >= ? * bet", min_multiplier), ("bonus_win > ? * bet", min_bonus_multiplier),
+        ]
+        for condition, value in filters:
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if bonus_triggered is not None:
+            conditions.append("bonus_triggered = ?")
+            params.append(int(bonus_triggered))
+
+        query = "SELECT * FROM sessions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order_by}"
+        if order_by != "timestamp":
+            query += " DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [self._session_row(row) for row in self.conn.execute(query, params)]
+
+    def get_session(self, session_id: str) -> dict | None:
+        """Celotna seja v enaki obliki kot database/log_<id>.json (za revizijo in ponovitev)."""
+        self.flush()
+        row = self.conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = self._session_row(row)
+        del session["bonus_triggered"]
+        wins_by_spin: dict[int, list] = {}
+        for w in self.conn.execute(
+                "SELECT * FROM wins WHERE session_id = ? ORDER BY spin_index, win_index", (session_id,)):
+            wins_by_spin.setdefault(w["spin_index"], []).append({
+                "type": w["type"],
+                "symbols": json.loads(w["symbols"]),
+                "payout": w["payout"],
+                "positions": json.loads(w["positions"]),
+                "triggers": w["triggers"]
+            })
+        session["spins"] = [
+            {
+                "state": s["state"],
+                "window": json.loads(s["window"]),
+                "payout": s["payout"],
+                "wins": wins_by_spin.get(s["spin_index"], []),
+                "bonus_triggered": {
+                    "name": s["bonus_name"],
+                    "spins_awarded": s["spins_awarded"]
+                } if s["bonus_name"] is not None else None
+            }
+            for s in self.conn.execute("SELECT * FROM spins WHERE session_id = ? ORDER BY spin_index", (session_id,))
+        ]
+        return session
+
+    @staticmethod
+    def _session_row(row: sqlite3.Row) -> dict:
+        session = dict(row)
+        session["bonus_triggered"] = bool(session["bonus_triggered"])
+        session["wins_by_symbol"] = json.loads(session["wins_by_symbol"]) if session["wins_by_symbol"] else {}
+        return session
+
+    def import_json_logs(self, directory: str = "database") -> int:
+        """Uvozi obstoječe datoteke log_*.json (že uvožene seje se prepišejo)."""
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(directory, "log_*.json"))):
+            try:
+                with open(path, "r", encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Napaka pri uvozu {path}: {e}")
+                continue
+            missing = [key for key in REQUIRED_KEYS if key not in data]
+            if missing:
+                print(f"Napaka pri uvozu {path}: manjkajo polja {missing}")
+                continue
+            self.write(data)
+            imported += 1
+        self.flush()
+        return imported
+
+
+if __name__ == "__main__":
+    # Uporaba: python -m Classes.sessionStore [mapa_z_dnevniki] [pot_do_baze]
+    source = sys.argv[1] if len(sys.argv) > 1 else "database"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join("database", "sessions.db")
+    with SQLiteSessionStore(db_path) as store:
+        count = store.import_json_logs(source)
+        print(f"Uvoženih sej: {count} (skupaj v bazi: {store.count()})")
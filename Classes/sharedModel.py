@@ -0,0 +1,101 @@
+import io
+import pickle
+import numpy as np
+from multiprocessing import shared_memory
+from Classes.gameModel import GameModel
+
+# Manjše tabele se kopirajo v opis modela, večje (koluti, tabele zmag, ...) gredo v deljeni pomnilnik.
+MIN_SHARED_BYTES = 1024
+ALIGNMENT = 64
+
+
+class _SharingPickler(pickle.Pickler):
+    """Namesto NumPy tabel zapiše le sklic; tabele se zberejo za deljeni pomnilnik."""
+    def __init__(self, file) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays: list[np.ndarray] = []
+        self._index: dict[int, int] = {}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, np.ndarray) and obj.nbytes >= MIN_SHARED_BYTES and obj.dtype != object:
+            key = id(obj)
+            if key not in self._index:
+                self._index[key] = len(self.arrays)
+                self.arrays.append(obj)
+            return self._index[key]
+        return None
+
+
+class _AttachingUnpickler(pickle.Unpickler):
+    """Sklice na tabele nadomesti s pogledi v deljeni pomnilnik (brez kopiranja, samo za branje)."""
+    def __init__(self, file, buffer, layout) -> None:
+        super().__init__(file)
+        self.buffer = buffer
+        self.layout = layout
+
+    def persistent_load(self, pid):
+        offset, dtype, shape = self.layout[pid]
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.buffer, offset=offset)
+        array.flags.writeable = False
+        return array
+
+
+class SharedModel:
+    """
+    Preveden model, objavljen v multiprocessing.shared_memory.
+    Starševski proces model zgradi enkrat; NumPy tabele (koluti, linije, tabele izplačil, alias tabele)
+    in pickle preostanka modela se zapišejo v en blok, delovni procesi pa se z attach_model()
+    nanj priklopijo brez kopiranja tabel in brez ponovnega prevajanja configa.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, descriptor: dict) -> None:
+        self.shm = shm
+        self.descriptor: dict = descriptor
+
+    @classmethod
+    def publish(cls, config: dict, model: GameModel) -> "SharedModel":
+        for state in model.states.values():
+            state.get_batch_tables()
+        buffer = io.BytesIO()
+        pickler = _SharingPickler(buffer)
+        pickler.dump(model)
+        skeleton = buffer.getvalue()
+
+        layout = []
+        offset = _align(len(skeleton))
+        for array in pickler.arrays:
+            layout.append((offset, array.dtype.str, array.shape))
+            offset = _align(offset + array.nbytes)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, offset))
+        shm.buf[:len(skeleton)] = skeleton
+        for (start, _, _), array in zip(layout, pickler.arrays):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=start)
+            target[...] = array
+            del target
+        descriptor = {"name": shm.name, "size": offset, "skeleton_bytes": len(skeleton),
+                      "layout": layout, "config": config}
+        return cls(shm, descriptor)
+
+    def close(self) -> None:
+        """Sprosti blok (pokliče ga samo starševski proces, ko delovni procesi končajo)."""
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def attach_model(descriptor: dict) -> tuple[dict, GameModel, shared_memory.SharedMemory]:
+    """
+    Priklop delovnega procesa na objavljen model. Vrnjeni SharedMemory mora ostati živ,
+    dokler se model uporablja (tabele so pogledi v njegov pomnilnik).
+    """
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+    skeleton = bytes(shm.buf[:descriptor["skeleton_bytes"]])
+    model = _AttachingUnpickler(io.BytesIO(skeleton), shm.buf, descriptor["layout"]).load()
+    return descriptor["config"], model, shm
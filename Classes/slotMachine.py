@@ -1,12 +1,18 @@
-import random
+import numpy as np
 from Classes.reelSet import ReelSet
 from Classes.payline import Payline
 from Classes.paytable import Paytable
 from Classes.symbolWindow import SymbolWindow
 from Classes.spinWin import SpinWin
+from Classes.gameModel import GameModel, GameState
+from Classes import batchSpin
+from Classes.batchSpin import BatchResult, GameBatchResult
+from Classes.spinRng import SpinRNG
+from Classes.symbol import Symbol
 
 class SlotMachine:
-    def __init__(self, reel_sets: list[ReelSet], window_height: int):
+    def __init__(self, reel_sets: list[ReelSet], window_height: int, model: GameModel | None = None,
+                 rng: SpinRNG | None = None):
         self.reelSets: list[ReelSet] = reel_sets
         self.window_height: int = window_height
         self.state: str = "base"
@@ -14,10 +20,35 @@ class SlotMachine:
         self.pending_wins: list[SpinWin] = []
         self.custom_parameters: dict = {} 
         self.additional_parameters: dict = {}
+        self.paylines: list[Payline] = []
+        self.paytable: Paytable = Paytable()
+        self.line_lut: list[float] | None = None
+        self.game_state: GameState | None = None
+        self.model: GameModel | None = model
+        self.rng: SpinRNG = rng if rng is not None else SpinRNG()
+        # Nastavi ga StageProfiler.attach(); brez profilerja se nič ne meri.
+        self.profiler = None
+        if model is not None:
+            self.setState("base")
+
+    def setState(self, state_name: str) -> None:
+        """Preklopi na vnaprej prevedeno stanje modela (samo zamenjava referenc)."""
+        game_state = self.model.get_state(state_name)
+        self.reelSets = game_state.reel_sets
+        self.paylines = game_state.paylines
+        self.paytable = game_state.paytable
+        self.window_height = game_state.window_height
+        self.custom_parameters = game_state.custom_parameters
+        self.line_lut = game_state.line_lut
+        self.game_state = game_state
+        self.state = state_name
 
     def chooseReelSet(self) -> ReelSet:
         """Izbere set kolutov glede na uteži."""
-        return random.choices(
+        game_state = self.game_state
+        if game_state is not None and game_state.reel_sets is self.reelSets:
+            return self.reelSets[game_state.reel_set_sampler.sample(self.rng.random)]
+        return self.rng.random.choices(
             self.reelSets,
             weights=[rs.weight for rs in self.reelSets],
             k=1
@@ -28,36 +59,85 @@ class SlotMachine:
         Generira mrežo simbolov. 
         Tukaj se zgodi le RNG (naključna izbira) pozicij in transformacija simbolov.
         Ne izvajamo nobenih izračunov zmag.
+        Stolpci so deljene terke iz Reel.windows, CP vrednosti pa se zapišejo v vzporedno tabelo okna.
         """
         reel_set = self.chooseReelSet()
         window = SymbolWindow(len(reel_set.reels), self.window_height)
         
         bonus_symbol_base_name = self.custom_parameters.get("bonusSymbol", None)
         cp_weights = self.custom_parameters.get("CPWeights", {})
+        game_state = self.game_state
+        cp_sampler = game_state.cp_sampler if game_state is not None and game_state.custom_parameters is self.custom_parameters else None
+        rand = self.rng.random
+        randint = self.rng.random.randint
+        height = self.window_height
+        cells = window.symbols
+        cp_values, cp_labels, cp_cells = window.cp_values, window.cp_labels, window.cp_cells
+        line_keys = window.line_keys = [0] * len(cells) if self.line_lut is not None else None
 
         for col, reel in enumerate(reel_set.reels):
-            stop = random.randint(0, reel.count - 1)
-            symbols = reel.get_symbols(stop, self.window_height)
-
-            for row, symbol in enumerate(symbols):
-                symbol_copy = symbol.copy()
-                if symbol.name == bonus_symbol_base_name and cp_weights:
-                    value = random.choices(list(cp_weights.keys()), weights=list(cp_weights.values()), k=1)[0]
-                    symbol_copy.name = f"{bonus_symbol_base_name}_{value}"
-                
-                window.add_symbol(symbol_copy, row, col)
+            stop = randint(0, reel.count - 1)
+            column = reel.windows[stop] if reel.window_height == height else reel.get_window(stop, height)
+            start = col * height
+            cells[start:start + height] = column
+            if line_keys is not None:
+                line_keys[start:start + height] = reel.window_keys[stop]
+
+            if cp_weights:
+                for row, symbol in enumerate(column):
+                    if symbol.name == bonus_symbol_base_name:
+                        if cp_sampler is not None:
+                            i = cp_sampler.sample(rand)
+                            cp_values[start + row] = game_state.cp_values[i]
+                            cp_labels[start + row] = game_state.cp_labels[i]
+                        else:
+                            value = rand.choices(list(cp_weights.keys()), weights=list(cp_weights.values()), k=1)[0]
+                            cp_values[start + row] = float(value)
+                            cp_labels[start + row] = value
+                        cp_cells.append(start + row)
         
         return window
 
+    def _batch_generator(self, rng) -> np.random.Generator:
+        return self.rng.generator if rng is None else np.random.default_rng(rng)
+
+    def spin_batch(self, n: int, bet: float = 1.0, rng=None) -> BatchResult:
+        """
+        Vektorizirano izvede N neodvisnih vrtljajev v trenutnem stanju.
+        Vsak vrtljaj se da ponoviti skalarno: scanMatrix(result.symbol_window(i), ...)
+        vrne enako izplačilo kot result.totals[i].
+        Brez `rng` se uporabi generator stroja (self.rng).
+        """
+        tables = self.model.get_state(self.state).get_batch_tables()
+        return batchSpin.spin_batch(tables, n, bet, self._batch_generator(rng))
+
+    def play_batch(self, n: int, bet: float = 1.0, rng=None, base_reel_sets=None) -> GameBatchResult:
+        """
+        Vektorizirano odigra N celotnih iger: osnovni vrtljaj in sprožene brezplačne vrtljaje.
+        `base_reel_sets` (indeksi setov kolutov za osnovni vrtljaj) se uporabi pri stratificiranem vzorčenju.
+        """
+        rng = self._batch_generator(rng)
+        base = batchSpin.spin_batch(self.model.get_state("base").get_batch_tables(), n, bet, rng, base_reel_sets)
+        spins_awarded = np.where(base.triggered, base.trigger_spins, 0)
+        game_index = np.repeat(np.arange(n), spins_awarded)
+        freespins = None
+        if len(game_index) and "freespins" in self.model:
+            freespins = batchSpin.spin_batch(self.model.get_state("freespins").get_batch_tables(),
+                                             len(game_index), bet, rng)
+        return GameBatchResult(base, freespins, game_index)
+
     def evaluate_symbols(self, symbols: list, paytable: Paytable) -> float:
         """Preveri linijsko zmago za dano zaporedje simbolov."""
         first = symbols[0]
-        if first.is_scatter:
+        if first.flags & Symbol.SCATTER:
+            return 0.0
+        # CP simboli nosijo vrednost v vzporedni tabeli okna in na linijah ne plačujejo.
+        if first.name == self.custom_parameters.get("bonusSymbol") and self.custom_parameters.get("CPWeights"):
             return 0.0
         
         count = 1
         for symbol in symbols[1:]:
-            if symbol.name == first.name or symbol.is_wild:
+            if symbol.name == first.name or symbol.flags & Symbol.WILD:
                 count += 1
             else:
                 break
@@ -67,10 +147,9 @@ class SlotMachine:
     def evaluate_scatters(self, window: SymbolWindow, paytable: Paytable):
         """Prešteje scatterje in vrne zmage ter morebitne triggerje."""
         scatter_count: dict[str, int] = {}
-        for row in window.getMatrix():
-            for symbol in row:
-                if symbol.is_scatter:
-                    scatter_count[symbol.name] = scatter_count.get(symbol.name, 0) + 1
+        for symbol in window.symbols:
+            if symbol.flags & Symbol.SCATTER:
+                scatter_count[symbol.name] = scatter_count.get(symbol.name, 0) + 1
 
         total_payout = 0.0
         wins: list[SpinWin] = []
@@ -110,16 +189,11 @@ class SlotMachine:
         current_cp_count = 0
         current_cp_payout = 0
   
-        for row in window.getMatrix():
-            for symbol in row:
-                if symbol.name.startswith(f"{bonus_symbol_base}_"):
-                    try:
-                        val_str = symbol.name.split("_")[1]
-                        val = float(val_str)
-                        current_cp_count += 1
-                        current_cp_payout += val
-                    except (IndexError, ValueError):
-                        continue
+        # Seštevamo po stolpcih, v vrstnem redu žrebanja (enako kot vektorizirana pot).
+        cp_values = window.cp_values
+        for index in window.cp_cells:
+            current_cp_count += 1
+            current_cp_payout += cp_values[index]
 
         if current_cp_count >= threshold and threshold > 0:
             win = SpinWin(
@@ -143,12 +217,21 @@ class SlotMachine:
     def scanMatrix(self, window: SymbolWindow, paylines: list[Payline], paytable: Paytable, bet: float) -> tuple[float, list[SpinWin], dict | None]:
         total_payout = 0.0
         wins: list[SpinWin] = []
-        matrix = window.getMatrix()
         num_paylines = len(paylines)
+        cells = window.symbols
+        # Hitra pot: ključ linije iz prispevkov celic in branje iz vnaprej izračunane tabele zmag.
+        lut = self.line_lut if paytable is self.paytable and window.line_keys is not None else None
+        line_keys = window.line_keys
 
         for payline in paylines:
-            symbols = payline.get_symbol_positions(matrix)
-            base_payout = self.evaluate_symbols(symbols, paytable)
+            if lut is not None:
+                base_payout = lut[sum(payline.key_getter(line_keys))]
+                if base_payout <= 0:
+                    continue
+            indices = payline.cell_indices if payline.window_height == window.height else payline.get_cell_indices(window.width, window.height)
+            symbols = [cells[i] for i in indices]
+            if lut is None:
+                base_payout = self.evaluate_symbols(symbols, paytable)
             
             if base_payout > 0:
                 actual_payout = (base_payout * bet) / num_paylines
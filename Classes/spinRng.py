@@ -0,0 +1,50 @@
+import random
+import numpy as np
+
+
+class SpinRNG:
+    """
+    Generator naključnih števil enega stroja.
+    Izhaja iz glavnega semena (SeedSequence), iz katerega se izpeljejo neodvisni tokovi
+    za delovne procese, zato je vsako simulacijo mogoče ponoviti do bita natančno.
+    Skalarna pot uporablja random.Random (hitrejši posamezni klici), vektorizirana pa numpy Generator.
+    """
+    def __init__(self, seed: int | np.random.SeedSequence | None = None) -> None:
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence: np.random.SeedSequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        scalar_seed = int.from_bytes(self.seed_sequence.generate_state(4, np.uint64).tobytes(), "little")
+        self.random: random.Random = random.Random(scalar_seed)
+        self.generator: np.random.Generator = np.random.Generator(np.random.PCG64(self.seed_sequence))
+
+    @classmethod
+    def for_worker(cls, seed: int, worker_index: int) -> "SpinRNG":
+        """Tok za i-ti delovni proces (enak i-temu otroku SeedSequence(seed).spawn)."""
+        return cls(np.random.SeedSequence(seed, spawn_key=(worker_index,)))
+
+    @property
+    def seed(self) -> int:
+        return self.seed_sequence.entropy
+
+    @property
+    def spawn_key(self) -> tuple:
+        return tuple(self.seed_sequence.spawn_key)
+
+    def spawn(self, n: int) -> list["SpinRNG"]:
+        return [SpinRNG(child) for child in self.seed_sequence.spawn(n)]
+
+    def describe(self) -> dict:
+        return {"seed": self.seed, "spawn_key": list(self.spawn_key)}
+
+    def get_state(self) -> dict:
+        version, internal, gauss = self.random.getstate()
+        return {
+            "random": [version, list(internal), gauss],
+            "generator": self.generator.bit_generator.state
+        }
+
+    def set_state(self, state: dict) -> None:
+        version, internal, gauss = state["random"]
+        self.random.setstate((version, tuple(internal), gauss))
+        self.generator.bit_generator.state = state["generator"]
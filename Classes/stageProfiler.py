@@ -0,0 +1,81 @@
+import time
+
+
+class StageProfiler:
+    """
+    Merjenje časa po fazah vrtljaja (izklopljeno ne stane nič).
+    attach() nadomesti izbrane metode na instanci stroja z merjenimi ovojnicami,
+    zato razred SlotMachine in stroji brez profilerja ostanejo nespremenjeni.
+    Za vsako fazo se beležijo klici, skupni čas (z gnezdenimi fazami) in lastni čas (brez njih).
+    """
+    # Metode SlotMachine, ki se merijo (setState je preklop stanja v spin_machine).
+    STAGES = ("setState", "chooseReelSet", "getSymbolWindow", "scanMatrix", "evaluate_scatters",
+              "_evaluate_collection_feature", "play_batch")
+
+    def __init__(self) -> None:
+        # faza -> [klici, skupni čas, lastni čas]
+        self.stages: dict[str, list] = {}
+        self._stack: list[float] = []
+
+    def wrap(self, func, stage: str):
+        record = self.stages.setdefault(stage, [0, 0.0, 0.0])
+        stack = self._stack
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                children = stack.pop()
+                record[0] += 1
+                record[1] += elapsed
+                record[2] += elapsed - children
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+    def call(self, stage: str, func, *args, **kwargs):
+        return self.wrap(func, stage)(*args, **kwargs)
+
+    def attach(self, machine) -> None:
+        machine.profiler = self
+        for stage in self.STAGES:
+            setattr(machine, stage, self.wrap(getattr(machine, stage), stage))
+
+    def detach(self, machine) -> None:
+        machine.profiler = None
+        for stage in self.STAGES:
+            machine.__dict__.pop(stage, None)
+
+    def to_dict(self) -> dict:
+        return {
+            stage: {"calls": calls, "total_seconds": total, "self_seconds": own}
+            for stage, (calls, total, own) in self.stages.items()
+        }
+
+    @staticmethod
+    def merge(target: dict, source: dict) -> dict:
+        """Prišteje profil (to_dict) drugega procesa."""
+        for stage, values in source.items():
+            record = target.setdefault(stage, {"calls": 0, "total_seconds": 0.0, "self_seconds": 0.0})
+            for key in record:
+                record[key] += values[key]
+        return target
+
+    @staticmethod
+    def breakdown(profile: dict) -> dict:
+        """Faze urejene po lastnem času, s povprečjem na klic in deležem vsega izmerjenega časa."""
+        measured = sum(values["self_seconds"] for values in profile.values()) or 1.0
+        ordered = sorted(profile.items(), key=lambda kv: kv[1]["self_seconds"], reverse=True)
+        return {
+            stage: {
+                "calls": values["calls"],
+                "total_seconds": round(values["total_seconds"], 4),
+                "self_seconds": round(values["self_seconds"], 4),
+                "us_per_call": round(values["total_seconds"] / values["calls"] * 1e6, 3) if values["calls"] else 0.0,
+                "self_share": round(values["self_seconds"] / measured, 4),
+            } for stage, values in ordered if values["calls"]
+        }
@@ -1,14 +1,28 @@
 class Symbol:
-  def __init__(self, name: str, is_scatter: bool = False, is_wild: bool = False) -> None:
+  __slots__ = ("name", "code", "flags")
+
+  # Bitne zastavice simbola
+  WILD = 1
+  SCATTER = 2
+
+  def __init__(self, name: str, is_scatter: bool = False, is_wild: bool = False, code: int = -1) -> None:
       self.name: str = name
-      self.is_scatter: bool = is_scatter
-      self.is_wild: bool = is_wild
+      self.code: int = code
+      self.flags: int = (Symbol.WILD if is_wild else 0) | (Symbol.SCATTER if is_scatter else 0)
+
+  @property
+  def is_scatter(self) -> bool:
+    return bool(self.flags & Symbol.SCATTER)
+
+  @property
+  def is_wild(self) -> bool:
+    return bool(self.flags & Symbol.WILD)
     
   def __repr__(self):
     return f"{self.name}"
   
   def copy(self):
-    return Symbol(self.name, self.is_scatter, self.is_wild)
+    return Symbol(self.name, self.is_scatter, self.is_wild, self.code)
 
   def equals(self, other: 'Symbol') -> bool:
-    return self.name == other.name and self.is_scatter == other.is_scatter and self.is_wild == other.is_wild
\ No newline at end of file
+    return self.name == other.name and self.is_scatter == other.is_scatter and self.is_wild == other.is_wild
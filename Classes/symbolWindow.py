@@ -2,19 +2,54 @@ from Classes.symbol import Symbol
 from typing import List, Optional
 
 class SymbolWindow:
+  __slots__ = ("width", "height", "symbols", "cp_values", "cp_labels", "cp_cells", "line_keys")
+
   def __init__(self, width: int, height: int):
     self.width: int = width
     self.height: int = height
-    self.symbols: List[List[Optional[Symbol]]] = [
-      [None for _ in range(width)]
-      for _ in range(height)
-    ]
+    size = width * height
+    # Ploska tabela celic po stolpcih: indeks = col * height + row.
+    # Stolpec se tako prepiše z eno rezino iz vnaprej izračunanih tabel kolutov (Reel.windows).
+    self.symbols: List[Optional[Symbol]] = [None] * size
+    # Vzporedni tabeli CP vrednosti in njihovih oznak (oznaka je potrebna le za izpis).
+    self.cp_values: List[float] = [0.0] * size
+    self.cp_labels: List[Optional[str]] = [None] * size
+    # Indeksi celic s CP simbolom v vrstnem redu žrebanja.
+    self.cp_cells: List[int] = []
+    # Prispevki celic h ključu linije (koda * B**stolpec); None, če okno ni iz prevedenega modela.
+    self.line_keys: Optional[List[int]] = None
+
+  def index(self, row: int, col: int) -> int:
+    return col * self.height + row
+
+  def set_column(self, col: int, symbols: tuple) -> None:
+    start = col * self.height
+    self.symbols[start:start + self.height] = symbols
+
+  def set_cp_value(self, row: int, col: int, label: str, value: float) -> None:
+    i = col * self.height + row
+    self.cp_values[i] = value
+    self.cp_labels[i] = label
+    self.cp_cells.append(i)
 
   def add_symbol(self, symbol: Symbol, row: int, col: int) -> None:
-    self.symbols[row][col] = symbol
+    self.symbols[col * self.height + row] = symbol
 
   def get_symbol(self, row: int, col: int) -> Symbol:
-    return self.symbols[row][col]
+    return self.symbols[col * self.height + row]
+
+  def get_symbol_name(self, row: int, col: int) -> str:
+    """Ime za izpis (log/UI): CP simboli dobijo pripeto vrednost, npr. "CP_0.2"."""
+    i = col * self.height + row
+    label = self.cp_labels[i]
+    name = self.symbols[i].name
+    return f"{name}_{label}" if label is not None else name
+
+  def get_line_names(self, positions: list[int]) -> list[str]:
+    return [self.get_symbol_name(row, col) for col, row in enumerate(positions[:self.width])]
+
+  def get_name_matrix(self) -> List[List[str]]:
+    return [[self.get_symbol_name(row, col) for col in range(self.width)] for row in range(self.height)]
 
   def getMatrix(self) -> List[List[Optional[Symbol]]]:
-    return self.symbols
+    return [[self.get_symbol(row, col) for col in range(self.width)] for row in range(self.height)]
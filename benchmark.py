@@ -0,0 +1,241 @@
+import io
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import multiprocessing as mp
+from datetime import datetime
+import numpy as np
+import simulator
+from main import GameModel, SlotMachine, spin_machine
+from Classes.spinRng import SpinRNG
+from Classes.sessionLog import NullSink, JsonFileSink, SegmentLogSink
+from Classes.sessionResult import SessionResult
+
+# Sintetične različice configa (večji modeli): število kolutov, linij in višina okna.
+SYNTHETIC_CONFIGS = {
+    "reels_7": {"reels": 7},
+    "paylines_50": {"paylines": 50},
+    "height_5": {"height": 5},
+    "large": {"reels": 6, "paylines": 100, "height": 4},
+}
+# Dovoljen padec hitrosti glede na primerjalni tek, preden ga označimo kot regresijo.
+REGRESSION_TOLERANCE = 0.15
+# Število brezplačnih vrtljajev v seji z vsiljenim bonusom (enako kot sprožitev v osnovni igri).
+FORCED_FREESPINS = 5
+
+def synthetic_config(config, reels=None, paylines=None, height=None, seed=0):
+    """
+    Povečan config za obremenitvene teste: koluti se ponovijo, izplačila za daljše zadetke podvojijo,
+    linije podaljšajo in dopolnijo z naključnimi (deterministično s semenom).
+    """
+    rng = np.random.default_rng(seed)
+    result = copy.deepcopy(config)
+    for state in result.values():
+        width = len(state["reel_sets"][0]["reels"])
+        new_width = reels or width
+        new_height = height or state["window_height"]
+        for rs in state["reel_sets"]:
+            rs["reels"] = [rs["reels"][i % width] for i in range(new_width)]
+        for rules in state["paytable"].values():
+            counts = sorted(int(c) for c, rule in rules.items() if isinstance(rule, (int, float)))
+            if counts and new_width > width:
+                for count in range(width + 1, new_width + 1):
+                    rules[str(count)] = rules[str(counts[-1])] * 2 ** (count - counts[-1])
+        lines = [[min(line[i % len(line)], new_height - 1) for i in range(new_width)] for line in state["paylines"]]
+        while paylines and len(lines) < paylines:
+            lines.append(rng.integers(0, new_height, new_width).tolist())
+        state["paylines"] = lines[:paylines] if paylines else lines
+        state["window_height"] = new_height
+    return result
+
+def measure(func, iterations, repeats=3):
+    """Najboljši od `repeats` tekov po `iterations` klicev (operacije na sekundo)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return {"iterations": iterations, "ops_per_sec": round(iterations / best, 1), "us_per_op": round(best / iterations * 1e6, 3)}
+
+def forced_freespins_session(machine, bet, sink):
+    """Seja, ki se začne s sproženimi brezplačnimi vrtljaji (enaka pot kot v spin_machine)."""
+    machine.setState("base")
+    machine.pending_wins.clear()
+    result = SessionResult("benchmark", "", bet, {name: 0.0 for name in machine.model.get_state("base").symbols})
+    machine.setState("freespins")
+    machine.remaining_spins = FORCED_FREESPINS
+    while machine.remaining_spins > 0:
+        window = machine.getSymbolWindow()
+        total, wins, bonus_trigger = machine.scanMatrix(window, machine.paylines, machine.paytable, bet)
+        result.add_spin("freespins", window, total, wins, bonus_trigger)
+        machine.remaining_spins -= 1
+    machine.setState("base")
+    result.finish()
+    if sink.enabled:
+        sink.write(result.to_dict())
+    return result
+
+def bench_engine(name, config, scale, workdir):
+    """Hitrost getSymbolWindow, scanMatrix in celotnih sej (osnovne in vsiljeni brezplačni vrtljaji, z/brez dnevnika)."""
+    model = GameModel.from_config(config)
+    machine = SlotMachine(reel_sets=[], window_height=config["base"]["window_height"], model=model, rng=SpinRNG(0))
+    results = {}
+    for state in ("base", "freespins"):
+        if state not in model:
+            continue
+        machine.setState(state)
+        windows = [machine.getSymbolWindow() for _ in range(1000)]
+        results[f"getSymbolWindow_{state}"] = measure(machine.getSymbolWindow, 20_000 * scale)
+
+        def scan(windows=windows):
+            for window in windows:
+                machine.scanMatrix(window, machine.paylines, machine.paytable, 1.0)
+            machine.pending_wins.clear()
+        scan_result = measure(scan, 10 * scale)
+        scan_result["iterations"] *= len(windows)
+        scan_result["ops_per_sec"] = round(scan_result["ops_per_sec"] * len(windows), 1)
+        scan_result["us_per_op"] = round(scan_result["us_per_op"] / len(windows), 3)
+        results[f"scanMatrix_{state}"] = scan_result
+
+    sinks = {
+        "no_log": lambda: NullSink(),
+        "segment_log": lambda: SegmentLogSink(os.path.join(workdir, f"segments_{name}"), fsync_every=1000),
+        "json_files": lambda: JsonFileSink(os.path.join(workdir, f"json_{name}"), verbose=False),
+    }
+    for sink_name, make_sink in sinks.items():
+        sink = make_sink()
+        iterations = (2_000 if sink_name != "json_files" else 200) * scale
+        results[f"spin_machine_base_{sink_name}"] = measure(
+            lambda: spin_machine(machine, config, 1.0, sink=sink), iterations)
+        if "freespins" in model:
+            results[f"spin_machine_freespins_{sink_name}"] = measure(
+                lambda: forced_freespins_session(machine, 1.0, sink), iterations // 2)
+        sink.close()
+    return results
+
+def bench_simulator(config, max_cores, games, workdir):
+    """Igre na sekundo prek run_simulation za 1..N jeder (skalarno in vektorizirano)."""
+    results = {}
+    cwd = os.getcwd()
+    run_dir = tempfile.mkdtemp(dir=workdir)
+    with open(os.path.join(run_dir, "config.json"), "w", encoding='utf-8') as f:
+        json.dump(config, f)
+    os.chdir(run_dir)
+    try:
+        for engine, engine_games in (("scalar", games), ("batch", games * 20)):
+            for cores in range(1, max_cores + 1):
+                simulator._worker_cache.clear()
+                chunk = max(1, engine_games // (cores * 4))
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    simulator.run_simulation(engine_games, 1.0, num_cores=cores, engine=engine, seed=0, chunk_size=chunk)
+                elapsed = time.perf_counter() - start
+                results[f"run_simulation_{engine}_{cores}_cores"] = {
+                    "iterations": engine_games, "ops_per_sec": round(engine_games / elapsed, 1),
+                    "us_per_op": round(elapsed / engine_games * 1e6, 3)
+                }
+    finally:
+        os.chdir(cwd)
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": mp.cpu_count(),
+        "commit": commit or None,
+    }
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Seznam meritev, ki so glede na primerjalni tek počasnejše za več kot `tolerance`."""
+    regressions = []
+    for config_name, benchmarks in results.items():
+        for bench, value in benchmarks.items():
+            old = baseline.get("results", {}).get(config_name, {}).get(bench)
+            if old and value["ops_per_sec"] < old["ops_per_sec"] * (1 - tolerance):
+                regressions.append({
+                    "config": config_name, "benchmark": bench,
+                    "baseline_ops_per_sec": old["ops_per_sec"], "ops_per_sec": value["ops_per_sec"],
+                    "change": round(value["ops_per_sec"] / old["ops_per_sec"] - 1, 4)
+                })
+    return regressions
+
+def run_benchmarks(config_path="config.json", configs=None, max_cores=None, sim_games=20_000, scale=1,
+                   skip_simulator=False):
+    with open(config_path, "r", encoding='utf-8') as f:
+        config = json.load(f)
+    variants = {"config": config}
+    for name, params in SYNTHETIC_CONFIGS.items():
+        variants[name] = synthetic_config(config, **params)
+    if configs:
+        variants = {name: c for name, c in variants.items() if name in configs}
+    max_cores = max_cores or mp.cpu_count()
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="slot_benchmark_")
+    try:
+        for name, variant in variants.items():
+            print(f"Merim: {name}...", flush=True)
+            results[name] = bench_engine(name, variant, scale, workdir)
+            if not skip_simulator:
+                results[name].update(bench_simulator(variant, max_cores, sim_games, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": environment(),
+        "configs": {name: SYNTHETIC_CONFIGS.get(name, {}) for name in variants},
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Meritve hitrosti igralnega pogona in simulatorja.")
+    parser.add_argument("--configs", nargs="*", help=f"Izbor configov: config {' '.join(SYNTHETIC_CONFIGS)}")
+    parser.add_argument("--cores", type=int, default=None, help="Največje število jeder za run_simulation")
+    parser.add_argument("--sim-games", type=int, default=20_000, help="Število iger za skalarni run_simulation")
+    parser.add_argument("--scale", type=int, default=1, help="Množitelj števila ponovitev")
+    parser.add_argument("--skip-simulator", action="store_true", help="Brez meritev run_simulation")
+    parser.add_argument("--baseline", help="Primerjalna JSON datoteka; ob regresiji izhod s kodo 1")
+    parser.add_argument("--output-dir", default="benchmarks", help="Mapa za rezultate (privzeto benchmarks)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(configs=args.configs, max_cores=args.cores, sim_games=args.sim_games,
+                            scale=args.scale, skip_simulator=args.skip_simulator)
+    if args.baseline:
+        with open(args.baseline, "r", encoding='utf-8') as f:
+            report["regressions"] = compare(report["results"], json.load(f))
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    path = os.path.join(args.output_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+
+    print(f"\n--- REZULTATI MERITEV ---")
+    for name, benchmarks in report["results"].items():
+        print(f"{name}:")
+        for bench, value in benchmarks.items():
+            print(f"  {bench}: {value['ops_per_sec']:,.0f} /s ({value['us_per_op']} µs)")
+    print(f"Rezultati shranjeni v: {path}")
+    if report.get("regressions"):
+        print(f"\nRegresije (več kot {REGRESSION_TOLERANCE:.0%} počasneje):")
+        for r in report["regressions"]:
+            print(f"  {r['config']} / {r['benchmark']}: {r['baseline_ops_per_sec']:,.0f} -> {r['ops_per_sec']:,.0f} /s ({r['change']:+.1%})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
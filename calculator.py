@@ -0,0 +1,197 @@
+import json
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+import numpy as np
+from main import GameModel
+from Classes.batchSpin import BatchTables
+
+EXCEL_PATH = os.path.join("calculations", "SlotMachine96.xlsx")
+
+def symbol_count_distribution(tables: BatchTables, reel_set: int, code: int) -> np.ndarray:
+    """Porazdelitev števila simbolov `code` na celotnem oknu (konvolucija po kolutih)."""
+    dist = np.array([1.0])
+    for col in range(tables.width):
+        length = tables.reel_lengths[reel_set, col]
+        column = tables.columns[reel_set, col, :length]
+        per_stop = (column == code).sum(axis=1)
+        reel_dist = np.bincount(per_stop, minlength=tables.height + 1) / length
+        dist = np.convolve(dist, reel_dist)
+    return dist
+
+def line_expectation(tables: BatchTables, reel_set: int) -> np.ndarray:
+    """
+    Pričakovano izplačilo ene linije po prvem simbolu (v enotah stave na linijo).
+    Vsaka linija vzame po eno celico iz vsakega koluta, zato so koluti neodvisni.
+    """
+    num_symbols = len(tables.symbol_names)
+    freq = np.zeros((tables.width, num_symbols))
+    for col in range(tables.width):
+        length = tables.reel_lengths[reel_set, col]
+        strip = tables.columns[reel_set, col, :length, 0]
+        freq[col] = np.bincount(strip, minlength=num_symbols) / length
+
+    expectation = np.zeros(num_symbols)
+    for first in range(num_symbols):
+        matches = tables.is_wild.copy()
+        matches[first] = True
+        prob_run = freq[0, first]
+        for count in range(1, tables.width + 1):
+            if count < tables.width:
+                p_match = freq[count, matches].sum()
+                expectation[first] += prob_run * (1.0 - p_match) * tables.line_pay[first, count]
+                prob_run *= p_match
+            else:
+                expectation[first] += prob_run * tables.line_pay[first, count]
+    return expectation
+
+def reel_set_expectation(tables: BatchTables, reel_set: int) -> dict:
+    """Točne pričakovane vrednosti enega vrtljaja na danem setu kolutov."""
+    cells = tables.width * tables.height
+    mean_cp_value = float(tables.cp_values @ tables.cp_probs) if len(tables.cp_values) else 0.0
+    per_symbol = line_expectation(tables, reel_set)
+    result = {
+        "line_rtp": float(per_symbol.sum()),
+        "scatter_rtp": 0.0,
+        "collection_rtp": 0.0,
+        "trigger_probability": 0.0,
+        "expected_spins_awarded": 0.0,
+        "collection_probability": 0.0,
+        "symbol_line_rtp": per_symbol,
+    }
+    for i, code in enumerate(tables.scatter_codes):
+        dist = np.zeros(cells + 1)
+        d = symbol_count_distribution(tables, reel_set, code)
+        dist[:len(d)] = d
+        result["scatter_rtp"] += float(dist @ tables.scatter_pay[i])
+        result["trigger_probability"] += float(dist[tables.scatter_has_trigger[i]].sum())
+        result["expected_spins_awarded"] += float(dist @ tables.scatter_trigger[i])
+
+    if tables.bonus_code >= 0 and tables.threshold > 0:
+        dist = symbol_count_distribution(tables, reel_set, tables.bonus_code)
+        counts = np.arange(len(dist))
+        collected = counts >= tables.threshold
+        result["collection_probability"] = float(dist[collected].sum())
+        result["collection_rtp"] = float((dist[collected] * counts[collected]).sum()) * mean_cp_value
+    return result
+
+def state_expectation(tables: BatchTables) -> dict:
+    """Točne pričakovane vrednosti enega vrtljaja v danem stanju (utežene po setih kolutov)."""
+    num_symbols = len(tables.symbol_names)
+    keys = ("line_rtp", "scatter_rtp", "collection_rtp", "trigger_probability",
+            "expected_spins_awarded", "collection_probability")
+    result = {key: 0.0 for key in keys}
+    result["symbol_line_rtp"] = np.zeros(num_symbols)
+
+    for rs, p_rs in enumerate(tables.reel_set_probs):
+        if p_rs == 0:
+            continue
+        expectation = reel_set_expectation(tables, rs)
+        for key in keys:
+            result[key] += p_rs * expectation[key]
+        result["symbol_line_rtp"] += p_rs * expectation["symbol_line_rtp"]
+
+    result["spin_rtp"] = result["line_rtp"] + result["scatter_rtp"] + result["collection_rtp"]
+    result["symbol_line_rtp"] = {name: float(result["symbol_line_rtp"][i]) for i, name in enumerate(tables.symbol_names)}
+    return result
+
+def calculate_exact_rtp(config: dict) -> dict:
+    """Točen RTP celotne igre: osnovni vrtljaj + pričakovano število brezplačnih vrtljajev."""
+    model = GameModel.from_config(config)
+    base = state_expectation(model.get_state("base").get_batch_tables())
+    freespins = None
+    bonus_rtp = 0.0
+    if "freespins" in model:
+        freespins = state_expectation(model.get_state("freespins").get_batch_tables())
+        # Brezplačni vrtljaji ne sprožijo novih (enako kot spin_machine).
+        bonus_rtp = base["expected_spins_awarded"] * freespins["spin_rtp"]
+
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "total_rtp": base["spin_rtp"] + bonus_rtp,
+        "base_line_rtp": base["line_rtp"],
+        "base_scatter_rtp": base["scatter_rtp"],
+        "base_collection_rtp": base["collection_rtp"],
+        "base_rtp": base["spin_rtp"],
+        "freespins_rtp": bonus_rtp,
+        "bonus_trigger_probability": base["trigger_probability"],
+        "bonus_trigger_hitrate": f"1 in {round(1 / base['trigger_probability'], 2)}" if base["trigger_probability"] else None,
+        "base_collection_probability": base["collection_probability"],
+        "base": base,
+        "freespins": freespins,
+    }
+
+def read_excel_summary(path: str = EXCEL_PATH) -> dict:
+    """Prebere izračunane vrednosti iz lista Summary_calculations (brez zunanjih knjižnic)."""
+    ns = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+          "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships"}
+    with zipfile.ZipFile(path) as zf:
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+        sheet = next(s for s in workbook.find("m:sheets", ns) if s.get("name") == "Summary_calculations")
+        target = targets[sheet.get(f"{{{ns['r']}}}id")].lstrip("/")
+        if not target.startswith("xl/"):
+            target = f"xl/{target}"
+        root = ET.fromstring(zf.read(target))
+
+    values = {}
+    for cell in root.iter(f"{{{ns['m']}}}c"):
+        v = cell.find("m:v", ns)
+        if v is not None and cell.get("t", "n") == "n":
+            values[cell.get("r")] = float(v.text)
+
+    return {
+        "reel_set_weights": [values.get("C3"), values.get("D3")],
+        "base_line_rtp": values.get("C13"),
+        "base_collection_rtp": values.get("C14"),
+        "base_rtp": values.get("C15"),
+        "bonus_trigger_probability": values.get("C17"),
+        "freespins_rtp": values.get("C19"),
+        "total_rtp": values.get("C21"),
+    }
+
+def compare_with_excel(report: dict, excel: dict) -> dict:
+    return {
+        key: {"exact": report[key], "excel": excel[key], "difference": report[key] - excel[key]}
+        for key in ("base_line_rtp", "base_collection_rtp", "base_rtp",
+                    "bonus_trigger_probability", "freespins_rtp", "total_rtp")
+        if excel.get(key) is not None
+    }
+
+def main():
+    try:
+        with open("config.json", "r", encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print("Napaka: Datoteka config.json ni bila najdena.")
+        return
+
+    report = calculate_exact_rtp(config)
+    print(f"\n--- TOČEN IZRAČUN RTP ---")
+    print(f"Linije (osnovna igra): {report['base_line_rtp']:.6f}")
+    print(f"Collection (osnovna igra): {report['base_collection_rtp']:.6f}")
+    print(f"Brezplačni vrtljaji: {report['freespins_rtp']:.6f}")
+    print(f"Verjetnost sprožitve bonusa: {report['bonus_trigger_probability']:.6f} ({report['bonus_trigger_hitrate']})")
+    print(f"Skupni RTP: {report['total_rtp']:.6f}")
+
+    if os.path.exists(EXCEL_PATH):
+        excel = read_excel_summary(EXCEL_PATH)
+        report["excel_comparison"] = compare_with_excel(report, excel)
+        print(f"\nPrimerjava z {EXCEL_PATH}:")
+        for key, row in report["excel_comparison"].items():
+            print(f"  {key}: {row['exact']:.6f} / {row['excel']:.6f} (razlika {row['difference']:+.6f})")
+        config_weights = [rs["weight"] for rs in config["base"]["reel_sets"][:len(excel["reel_set_weights"])]]
+        if config_weights != excel["reel_set_weights"]:
+            print(f"  Opozorilo: uteži setov kolutov se razlikujejo (config {config_weights}, Excel {excel['reel_set_weights']})")
+
+    if not os.path.exists("calculations"):
+        os.makedirs("calculations")
+    path = os.path.join("calculations", "exact_rtp.json")
+    with open(path, "w", encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"\nIzračun shranjen v: {path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,127 +1,47 @@
 import uuid
-import json
-import os
 from datetime import datetime
-from Classes.symbol import Symbol
-from Classes.reel import Reel
-from Classes.reelSet import ReelSet
-from Classes.payline import Payline
-from Classes.paytable import Paytable
+from Classes.gameModel import GameModel
 from Classes.slotMachine import SlotMachine
+from Classes.sessionLog import SessionSink, NullSink, JsonFileSink
+from Classes.sessionResult import SessionResult
+from Classes.configLoader import ConfigError, load_model
 
-def load_symbols(data: dict) -> dict[str, Symbol]:
-    symbols = {}
-    for name, props in data.items():
-        symbols[name] = Symbol(
-            name,
-            is_wild=props.get("is_wild", False),
-            is_scatter=props.get("is_scatter", False)
-        )
-    return symbols
+def spin_machine(machine: SlotMachine, config: dict, bet: float, save_log: bool = True,
+                 sink: SessionSink | None = None):
+    # Brez podanega cilja: save_log=True ohrani zapis v database/log_<id>.json, sicer se seja ne zapiše.
+    if sink is None:
+        sink = JsonFileSink() if save_log else NullSink()
 
-def load_reel_sets(data: list, symbols: dict[str, Symbol]) -> list[ReelSet]:
-    reel_sets = []
-    for rs in data:
-        reels = []
-        for reel_symbols in rs["reels"]:
-            reels.append(Reel([symbols[s] for s in reel_symbols]))
-        reel_sets.append(ReelSet(reels=reels, weight=rs["weight"]))
-    return reel_sets
+    # Model se prevede le ob prvem klicu, nato stroj samo preklaplja med stanji.
+    if machine.model is None:
+        machine.model = GameModel.from_config(config)
+    machine.setState("base")
 
-def load_paylines(data: list) -> list[Payline]:
-    return [Payline(p) for p in data]
+    # Zmage iz prejšnjih sej se ne kopičijo (rezultat seje jih hrani sam).
+    machine.pending_wins.clear()
 
-def load_paytable(data: dict) -> Paytable:
-    paytable = Paytable()
-    for symbol, rules in data.items():
-        for count_str, rule_info in rules.items():
-            count = int(count_str)
-            if isinstance(rule_info, (int, float)):
-                paytable.add_rule(symbol, count, {"payout": rule_info})
-            elif isinstance(rule_info, dict):
-                paytable.add_rule(symbol, count, rule_info)
-    return paytable
-
-def spin_machine(machine: SlotMachine, config: dict, bet: float, save_log: bool = True):
     session_id = str(uuid.uuid4())
-    session_data = {
-        "session_id": session_id,
-        "timestamp": datetime.now().isoformat(),
-        "bet": bet,
-        "base_win": 0.0,
-        "bonus_win": 0.0,
-        "total_payout": 0.0,
-        "spins": [],
-        "wins_by_symbol": {name: 0.0 for name in config["base"]["symbols"]},
-        "total_freespins_played": 0
-    }
-
-    first_window_matrix = None
-
-    def update_machine_config(state):
-        used_config = config[state]
-        symbols = load_symbols(used_config["symbols"])
-        reel_sets = load_reel_sets(used_config["reel_sets"], symbols)
-        paylines = load_paylines(used_config["paylines"])
-        paytable = load_paytable(used_config["paytable"])
-        
-        machine.reelSets = reel_sets
-        machine.paylines = paylines
-        machine.paytable = paytable
-        machine.state = state
-        machine.custom_parameters = used_config.get("customParameters", {})
-
-    update_machine_config("base")
+    result = SessionResult(
+        session_id,
+        datetime.now().isoformat(),
+        bet,
+        {name: 0.0 for name in machine.model.get_state("base").symbols}
+    )
+
+    add_spin = result.add_spin
+    profiler = machine.profiler
+    if profiler is not None:
+        add_spin = profiler.wrap(add_spin, "record_spin")
 
     def single_spin():
-        nonlocal first_window_matrix 
-        
         window = machine.getSymbolWindow()
-        
-        if first_window_matrix is None:
-            first_window_matrix = window.getMatrix()
 
         spin_state = machine.state
         total, wins, bonus_trigger = machine.scanMatrix(window, machine.paylines, machine.paytable, bet)
-        
-        if spin_state == "base":
-            session_data["base_win"] += total
-        else:
-            session_data["bonus_win"] += total
-            session_data["total_freespins_played"] += 1
-        
-        session_data["total_payout"] += total
-
-        for w in wins:
-            if w.symbols and len(w.symbols) > 0:
-                s = w.symbols[0]
-                sym_name = s.name if hasattr(s, 'name') else str(s)
-                if sym_name in session_data["wins_by_symbol"]:
-                    session_data["wins_by_symbol"][sym_name] += w.payout
-
-        spin_log = {
-            "state": spin_state,
-            "window": [[s.name for s in row] for row in window.getMatrix()],
-            "payout": round(total, 2),
-            "wins": [
-                {
-                    "type": w.type,
-                    "symbols": [s.name if hasattr(s, 'name') else s for s in w.symbols],
-                    "payout": round(w.payout, 2),
-                    "positions": w.positions,
-                    "triggers": w.triggers
-                } for w in wins
-            ],
-            "bonus_triggered": {
-                "name": bonus_trigger["name"],
-                "spins_awarded": bonus_trigger["count"]
-            } if bonus_trigger else None
-        }
-        
-        session_data["spins"].append(spin_log)
+        add_spin(spin_state, window, total, wins, bonus_trigger)
 
         if bonus_trigger and spin_state == "base":
-            update_machine_config("freespins")
+            machine.setState("freespins")
             machine.remaining_spins = bonus_trigger['count']
 
         if spin_state == "freespins":
@@ -133,40 +53,30 @@ def spin_machine(machine: SlotMachine, config: dict, bet: float, save_log: bool
     while machine.state == "freespins" and machine.remaining_spins > 0:
         single_spin()
 
-    session_data["total_payout"] = round(session_data["total_payout"], 4)
-    session_data["base_win"] = round(session_data["base_win"], 4)
-    session_data["bonus_win"] = round(session_data["bonus_win"], 4)
-
-    if save_log:
-        save_session_to_json(session_data)
+    result.finish()
+    if sink.enabled:
+        if profiler is None:
+            sink.write(result.to_dict())
+        else:
+            profiler.call("write_log", lambda: sink.write(result.to_dict()))
     
-    return {
-        "total": session_data["total_payout"],
-        "base": session_data["base_win"],
-        "bonus": session_data["bonus_win"],
-        "all_spins": session_data["spins"],
-        "wins_by_symbol": session_data["wins_by_symbol"]
-    }, session_id
-  
-def save_session_to_json(data):
-    if not os.path.exists('database'):
-        os.makedirs('database')
-        
-    filename = f"database/log_{data['session_id'][:8]}.json"
-    with open(filename, "w", encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"\nSeja shranjena v {filename}")
+    return result, session_id
+
+def save_session_to_json(data, sink: SessionSink | None = None):
+    (sink if sink is not None else JsonFileSink()).write(data)
     
 def main():
     try:
-        with open("config.json", "r", encoding='utf-8') as f:
-            config = json.load(f)
+        config, model, _ = load_model("config.json")
     except FileNotFoundError:
         print("Napaka: Datoteka config.json ni bila najdena.")
         return
+    except ConfigError as e:
+        print(f"Napaka: {e}")
+        return
 
     BET_AMOUNT = 1.0
-    machine = SlotMachine(reel_sets=[], window_height=config["base"]["window_height"])
+    machine = SlotMachine(reel_sets=[], window_height=config["base"]["window_height"], model=model)
     
     outcome, session_id = spin_machine(machine, config, BET_AMOUNT, save_log=True)
     print(f"\n--- KONČNI REZULTAT SEJE ---")
@@ -0,0 +1,282 @@
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from main import SlotMachine, spin_machine
+from Classes.configLoader import ConfigWatcher, ConfigError, load_model
+from Classes.spinRng import SpinRNG
+from Classes.sessionLog import SegmentLogSink
+
+# Največ zahtevkov v enem klicu pogona in kako dolgo (v sekundah) čakamo na dodatne zahtevke.
+MAX_BATCH = 64
+BATCH_WINDOW = 0.002
+# Število zadnjih zahtevkov, iz katerih se računajo percentili zakasnitve.
+LATENCY_WINDOW = 10_000
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+MAX_BODY_BYTES = 64 * 1024
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+# Stroj delovnega procesa (model se naloži enkrat ob zagonu procesa in ob spremembi configa).
+_worker = {}
+
+def _init_worker(config_path, seed, worker_indices):
+    watcher = ConfigWatcher(config_path)
+    # Vsak proces vzame svoj indeks (0..N-1), zato je tok pri istem semenu vedno enak.
+    index = worker_indices.get()
+    rng = SpinRNG.for_worker(seed, index) if seed is not None else SpinRNG()
+    _worker["watcher"] = watcher
+    _worker["machine"] = SlotMachine(reel_sets=[], window_height=watcher.config["base"]["window_height"],
+                                     model=watcher.model, rng=rng)
+
+def play_sessions(bets):
+    """Odigra eno sejo za vsako stavo v paketu in vrne seje v obliki dnevnika."""
+    watcher, machine = _worker["watcher"], _worker["machine"]
+    if watcher.poll():
+        machine.model = watcher.model
+    return [spin_machine(machine, watcher.config, bet, save_log=False)[0].to_dict() for bet in bets]
+
+
+class SpinService:
+    """
+    Dolgo živeči strežnik vrtljajev: asyncio sprejema zahtevke, sočasni zahtevki se združijo
+    v paket (do MAX_BATCH ali BATCH_WINDOW) in odigrajo v enem klicu v skupini procesov.
+    """
+    def __init__(self, config_path="config.json", workers=None, seed=None, log_dir=None) -> None:
+        self.config_path = config_path
+        self.workers = workers or max(1, os.cpu_count() - 1)
+        self.seed = seed
+        self.sink = SegmentLogSink(log_dir) if log_dir else None
+        # Segmente piše ena nit, da se paketi različnih delovnih procesov ne prepletajo.
+        self.log_executor = ThreadPoolExecutor(max_workers=1) if log_dir else None
+        self.pool = None
+        # Število zagnanih skupin procesov; nova skupina dobi nove indekse procesov (glej _start_pool).
+        self.pool_generation = 0
+        self.queue = None
+        self.batchers = []
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    async def start(self) -> None:
+        # Neveljaven config se zavrne pred zagonom procesov; model se prevede v predpomnilnik za delovne procese.
+        load_model(self.config_path)
+        self._start_pool()
+        self.queue = asyncio.Queue()
+        self.started = time.time()
+        # Zagon delovnih procesov pred prvim zahtevkom (prevod modela ni v zakasnitvi).
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, play_sessions, []) for _ in range(self.workers)))
+        self.batchers = [asyncio.create_task(self._batcher()) for _ in range(self.workers)]
+
+    def _start_pool(self) -> None:
+        """
+        Zažene skupino procesov. Procesi i-te skupine vzamejo indekse i*N..i*N+N-1, zato je tok
+        pri istem semenu ponovljiv, nova skupina po padcu procesa pa ne ponovi že odigranih vrtljajev.
+        """
+        ctx = mp.get_context()
+        worker_indices = ctx.SimpleQueue()
+        first = self.pool_generation * self.workers
+        for index in range(first, first + self.workers):
+            worker_indices.put(index)
+        self.pool_generation += 1
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                        initargs=(self.config_path, self.seed, worker_indices))
+
+    async def close(self) -> None:
+        for task in self.batchers:
+            task.cancel()
+        await asyncio.gather(*self.batchers, return_exceptions=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.sink is not None:
+            self.log_executor.shutdown(wait=True)
+            self.sink.close()
+
+    async def spin(self, bet):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((bet, future))
+        return await future
+
+    async def _batcher(self) -> None:
+        """Zbere zahtevke iz vrste v paket in ga pošlje v skupino procesov (ena naloga na delovni proces)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + BATCH_WINDOW
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batch_sizes.append(len(batch))
+            pool = self.pool
+            try:
+                sessions = await loop.run_in_executor(pool, play_sessions, [bet for bet, _ in batch])
+            except BrokenProcessPool as e:
+                # Delovni proces je umrl (npr. OOM, SIGKILL): skupino zamenja prvi, ki to opazi.
+                if pool is self.pool:
+                    print("Opozorilo: delovni proces se je nepričakovano končal, zaganjam nove procese.", flush=True)
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._start_pool()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.sink is not None:
+                await loop.run_in_executor(self.log_executor, self._write_log, sessions)
+            for (_, future), session in zip(batch, sessions):
+                if not future.done():
+                    future.set_result(session)
+
+    def _write_log(self, sessions) -> None:
+        for session in sessions:
+            self.sink.write(session)
+
+    def stats(self) -> dict:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "workers": self.workers,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "latency_ms": {
+                **{f"p{p}": round(float(np.percentile(latencies, p)), 3) for p in LATENCY_PERCENTILES},
+                "mean": round(float(latencies.mean()), 3),
+                "max": round(float(latencies.max()), 3),
+            },
+            "avg_batch_size": round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+        }
+
+    async def handle(self, method, path, body):
+        """Vrne (status, odgovor) za en HTTP zahtevek."""
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if path != "/spin":
+            return 404, {"error": f"Neznana pot: {path}"}
+        if method != "POST":
+            return 405, {"error": "Vrtljaj zahteva POST."}
+        try:
+            payload = json.loads(body) if body else {}
+            bet = float(payload.get("bet", 1.0))
+        except (ValueError, TypeError, AttributeError):
+            return 400, {"error": "Telo mora biti JSON, npr. {\"bet\": 1.0}."}
+        if not (math.isfinite(bet) and bet > 0):
+            return 400, {"error": "Stava mora biti pozitivno končno število."}
+        start = time.perf_counter()
+        session = await self.spin(bet)
+        self.latencies.append(time.perf_counter() - start)
+        return 200, session
+
+    async def handle_connection(self, reader, writer) -> None:
+        """Minimalen HTTP/1.1 (Content-Length telo, keep-alive) nad asyncio tokom."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Neveljaven zahtevek."}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Neveljaven Content-Length."}, False)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Telo zahtevka je preveliko."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                try:
+                    status, response = await self.handle(method, path.split("?")[0], body)
+                except Exception as e:
+                    status, response = 500, {"error": str(e)}
+                if status >= 400:
+                    self.errors += 1
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, response, keep_alive) -> None:
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8080, unix_socket=None, **service_kwargs) -> None:
+    service = SpinService(**service_kwargs)
+    await service.start()
+    if unix_socket:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_socket)
+        address = unix_socket
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        address = f"http://{host}:{port}"
+    print(f"Strežnik vrtljajev teče na {address} ({service.workers} procesov). Poti: POST /spin, GET /stats, GET /health")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Strežnik vrtljajev (HTTP/JSON).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", help="Pot do Unix vtičnice namesto TCP")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--workers", type=int, default=None, help="Število delovnih procesov")
+    parser.add_argument("--seed", type=int, default=None, help="Glavno seme (tok i-tega procesa izhaja iz njega; "
+                        "z --workers 1 je zaporedje sej ponovljivo)")
+    parser.add_argument("--log-dir", help="Seje zapisuj v segmente v tej mapi (npr. database/segments)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, config_path=args.config, workers=args.workers,
+                          seed=args.seed, log_dir=args.log_dir))
+    except ConfigError as e:
+        print(f"Napaka: {e}")
+    except KeyboardInterrupt:
+        print("\nStrežnik ustavljen.")
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,70 @@ import json
 import csv
 import os
 import math
+import time
+import contextlib
 import multiprocessing as mp
-from datetime import datetime
-from main import spin_machine, SlotMachine, load_symbols, load_reel_sets
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import numpy as np
+from main import spin_machine, SlotMachine
+from Classes.spinRng import SpinRNG
+from Classes.payoutStats import PayoutStats, CovarianceStats
+from Classes.stageProfiler import StageProfiler
+from Classes.configLoader import ConfigError, load_model
+from Classes.sharedModel import SharedModel, attach_model
+from calculator import reel_set_expectation
 
-def worker_task(num_games, bet_amount):
+# Število iger v enem vektoriziranem paketu (omejuje porabo pomnilnika).
+BATCH_SIZE = 100_000
+# Privzeto število iger v eni nalogi za delovne procese.
+CHUNK_SIZES = {"scalar": 20_000, "batch": 1_000_000, "stratified": 1_000_000}
+# Kontrolne spremenljivke stratificiranega ocenjevalca (točne vrednosti po setih kolutov iz calculator.py).
+# Izplačila brezplačnih vrtljajev namenoma niso kontrole: skupaj z zgornjimi bi izplačilo igre
+# postalo linearna kombinacija kontrol in simulacija bi le ponovila analitični izračun.
+CONTROL_VARIATES = ("line_rtp", "trigger_probability", "collection_rtp")
+# Pasovi vsote CP (x stava) za porazdelitev collection dobitkov; meje kot pri PayoutStats.WIN_BANDS.
+CP_SUM_BANDS = [5, 10, 20, 50, 100, 250, 500]
+CP_SUM_BAND_LABELS = [f"0-{CP_SUM_BANDS[0]}x"] + [f"{lo}-{hi}x" for lo, hi in zip(CP_SUM_BANDS, CP_SUM_BANDS[1:])] + [f"{CP_SUM_BANDS[-1]}x+"]
+# Kako pogosto (v sekundah) izpišemo napredek in shranimo kontrolno točko.
+PROGRESS_INTERVAL = 5.0
+CHECKPOINT_INTERVAL = 60.0
+# Največ nalog hkrati v obdelavi na jedro in kolikokrat se naloga ponovi, če delovni proces umre.
+TASKS_PER_CORE = 2
+MAX_CHUNK_RETRIES = 3
+
+# Config in model se v vsakem procesu naložita le enkrat, ne za vsako nalogo
+# (preverjen config, preveden model iz predpomnilnika cache/).
+_worker_cache = {}
+
+def _load_worker_model():
+    if "model" not in _worker_cache:
+        _worker_cache["config"], _worker_cache["model"], _ = load_model("config.json")
+    return _worker_cache["config"], _worker_cache["model"]
+
+def _attach_worker_model(descriptor):
+    """Inicializacija delovnega procesa: model iz deljenega pomnilnika, ki ga je objavil glavni proces."""
+    _worker_cache["config"], _worker_cache["model"], _worker_cache["shm"] = attach_model(descriptor)
+
+def worker_task(num_games, bet_amount, engine="scalar", seed=None, chunk_index=0, profile=False):
     try:
-        with open("config.json", "r", encoding='utf-8') as f:
-            config = json.load(f)
-        
+        config, model = _load_worker_model()
         base_config = config.get("base")
         if not base_config: return None
 
-        symbols_def = load_symbols(base_config["symbols"])
-        reel_sets = load_reel_sets(base_config["reel_sets"], symbols_def)
-        machine = SlotMachine(reel_sets=reel_sets, window_height=base_config["window_height"])
-        machine.custom_parameters = base_config.get("customParameters", {})
+        # Vsaka naloga dobi svoj neodvisen tok iz glavnega semena.
+        rng = SpinRNG.for_worker(seed, chunk_index)
+        machine = SlotMachine(reel_sets=[], window_height=base_config["window_height"], model=model, rng=rng)
+        # Merjenje faz je opcijsko; brez njega stroj in spin_machine tečeta brez ovojnic.
+        profiler = None
+        play = spin_machine
+        if profile:
+            profiler = StageProfiler()
+            profiler.attach(machine)
+            play = profiler.wrap(spin_machine, "spin_machine")
 
         local_stats = {
             "total_games": num_games,
@@ -29,9 +77,45 @@ def worker_task(num_games, bet_amount):
             "sum_payout_squares": 0.0,
             "symbol_payouts": {name: 0.0 for name in base_config["symbols"]}
         }
+        payout_stats = PayoutStats()
+        features = new_feature_stats()
+
+        if engine in ("batch", "stratified"):
+            base_tables = model.get_state("base").get_batch_tables()
+            strata = [CovarianceStats(1 + len(CONTROL_VARIATES)) for _ in base_tables.reel_set_probs]
+            remaining = num_games
+            while remaining > 0:
+                size = min(BATCH_SIZE, remaining)
+                remaining -= size
+                if engine == "stratified":
+                    # Proporcionalna razporeditev: vsak set kolutov dobi točno svoj delež iger.
+                    reel_sets = np.repeat(np.arange(len(strata)), proportional_allocation(base_tables.reel_set_probs, size))
+                    games = machine.play_batch(size, bet_amount, base_reel_sets=reel_sets)
+                    add_strata(strata, games, bet_amount)
+                else:
+                    games = machine.play_batch(size, bet_amount)
+                local_stats["total_payout"] += float(games.totals.sum())
+                local_stats["base_payout"] += float(games.base_payouts.sum())
+                local_stats["bonus_payout"] += float(games.bonus_payouts.sum())
+                local_stats["winning_spins"] += int((games.totals > 0).sum())
+                multipliers = games.totals / bet_amount
+                local_stats["sum_payout_squares"] += float((multipliers ** 2).sum())
+                payout_stats.add_batch(multipliers)
+                local_stats["bonus_triggers"] += int(games.triggered.sum())
+                for sym, win_val in games.symbol_payouts().items():
+                    if sym in local_stats["symbol_payouts"]:
+                        local_stats["symbol_payouts"][sym] += win_val
+                add_batch_features(features, games)
+            local_stats["payout_stats"] = payout_stats.to_dict()
+            local_stats["feature_stats"] = features
+            if engine == "stratified":
+                local_stats["strata"] = [stratum.to_dict() for stratum in strata]
+            if profiler is not None:
+                local_stats["stage_profile"] = profiler.to_dict()
+            return local_stats
 
         for _ in range(num_games):
-            outcome, _ = spin_machine(machine, config, bet_amount, save_log=False)
+            outcome, _ = play(machine, config, bet_amount, save_log=False)
             payout = outcome.get("total", 0)
             local_stats["total_payout"] += payout
             local_stats["base_payout"] += outcome.get("base", 0)
@@ -42,29 +126,356 @@ def worker_task(num_games, bet_amount):
             
             multiplier = payout / bet_amount
             local_stats["sum_payout_squares"] += (multiplier ** 2)
+            payout_stats.add(multiplier)
 
             if "wins_by_symbol" in outcome:
                 for sym, win_val in outcome["wins_by_symbol"].items():
                     if sym in local_stats["symbol_payouts"]:
                         local_stats["symbol_payouts"][sym] += win_val
             
-            if outcome["all_spins"][0]["bonus_triggered"]:
+            if outcome["bonus_triggered"]:
                 local_stats["bonus_triggers"] += 1
+            add_session_features(features, outcome)
 
+        local_stats["payout_stats"] = payout_stats.to_dict()
+        local_stats["feature_stats"] = features
+        if profiler is not None:
+            local_stats["stage_profile"] = profiler.to_dict()
         return local_stats
     except Exception as e:
         print(f"Napaka v delovnem procesu: {e}")
         return None
 
-def run_simulation(total_games, bet_amount, num_cores=1, existing_filename=None):
+def proportional_allocation(probs, size):
+    """Število iger na stratum, sorazmerno verjetnostim (metoda največjih ostankov)."""
+    exact = np.asarray(probs) * size
+    counts = np.floor(exact).astype(np.int64)
+    remainder = size - int(counts.sum())
+    if remainder:
+        counts[np.argsort(counts - exact)[:remainder]] += 1
+    return counts
+
+def add_strata(strata, games, bet_amount):
+    """Za vsak set kolutov doda izplačilo igre in kontrolne spremenljivke osnovnega vrtljaja."""
+    base = games.base
+    values = np.column_stack([
+        games.totals / bet_amount,
+        base.line_payouts.sum(axis=1) / bet_amount,
+        base.triggered.astype(np.float64),
+        base.collection_payouts / bet_amount,
+    ])
+    for h, stratum in enumerate(strata):
+        stratum.add_batch(values[base.reel_set_index == h])
+
+def control_means(model):
+    """Točne vrednosti kontrolnih spremenljivk za vsak set kolutov osnovne igre."""
+    tables = model.get_state("base").get_batch_tables()
+    means = []
+    for rs, p in enumerate(tables.reel_set_probs):
+        expectation = reel_set_expectation(tables, rs) if p > 0 else {}
+        means.append([expectation.get(key, 0.0) for key in CONTROL_VARIATES])
+    return {"probabilities": tables.reel_set_probs.tolist(), "control_means": means}
+
+def stratified_estimate(history):
+    """
+    Stratificiran ocenjevalec RTP s kontrolnimi spremenljivkami.
+    Varianca povprečja po stratumih je S = sum(p_h^2 * Cov_h / n_h); koeficienti so beta = Sxx^-1 Sxy,
+    ocena pa povprečje izplačil popravljeno za odmik kontrolnih spremenljivk od točnih vrednosti.
+    """
+    strat = history.get("stratification")
+    if not strat or "strata" not in strat:
+        return None
+    strata = [CovarianceStats.from_dict(d) for d in strat["strata"]]
+    if sum(s.n for s in strata) != history["total_games"]:
+        return None
+    active = [h for h, p in enumerate(strat["probabilities"]) if p > 0]
+    if any(strata[h].n < 2 for h in active):
+        return None
+
+    probs = np.array([strat["probabilities"][h] for h in active])
+    means = np.array([strata[h].mean for h in active])
+    covs = [strata[h].covariance for h in active]
+    mean = probs @ means
+    S = sum(p * p * cov / strata[h].n for p, cov, h in zip(probs, covs, active))
+    exact = probs @ np.array([strat["control_means"][h] for h in active])
+
+    beta = np.linalg.pinv(S[1:, 1:]) @ S[1:, 0]
+    estimate = mean[0] - beta @ (mean[1:] - exact)
+    var_cv = max(S[0, 0] - S[1:, 0] @ beta, 0.0)
+    total_var = sum(p * (cov[0, 0] + (m[0] - mean[0]) ** 2) for p, cov, m in zip(probs, covs, means))
+    var_plain = total_var / history["total_games"]
+    return {
+        "rtp": float(estimate),
+        "std_dev": math.sqrt(total_var),
+        "margin": 1.96 * math.sqrt(var_cv),
+        "variance_plain": var_plain,
+        "variance_stratified": float(S[0, 0]),
+        "variance_control_variates": float(var_cv),
+        "control_coefficients": {name: float(b) for name, b in zip(CONTROL_VARIATES, beta)},
+    }
+
+def new_feature_stats():
+    """Števci za bonus funkcije: dolžine brezplačnih vrtljajev in collection (CP)."""
+    return {
+        "freespins_played": 0,
+        "freespin_lengths": {},
+        "state_spins": {"base": 0, "freespins": 0},
+        "cp_collections": {"base": 0, "freespins": 0},
+        "cp_sum_counts": [0] * len(CP_SUM_BAND_LABELS)
+    }
+
+def add_count(counts, key, n=1):
+    counts[key] = counts.get(key, 0) + n
+
+def add_session_features(features, outcome):
+    features["state_spins"]["base"] += 1
+    features["state_spins"]["freespins"] += outcome.freespins_played
+    features["freespins_played"] += outcome.freespins_played
+    if outcome.bonus_triggered:
+        add_count(features["freespin_lengths"], str(outcome.freespins_played))
+    for state, cp_sum in outcome.cp_collections:
+        add_count(features["cp_collections"], state)
+        features["cp_sum_counts"][bisect_left(CP_SUM_BANDS, cp_sum)] += 1
+
+def add_batch_features(features, games):
+    features["state_spins"]["base"] += len(games)
+    features["freespins_played"] += int(games.freespins_played.sum())
+    lengths, counts = np.unique(games.freespins_played[games.triggered], return_counts=True)
+    for length, count in zip(lengths, counts):
+        add_count(features["freespin_lengths"], str(int(length)), int(count))
+
+    for state, spins in (("base", games.base), ("freespins", games.freespins)):
+        if spins is None:
+            continue
+        if state == "freespins":
+            features["state_spins"]["freespins"] += len(spins)
+        add_count(features["cp_collections"], state, int(spins.collected.sum()))
+        bands = np.searchsorted(CP_SUM_BANDS, spins.cp_sums[spins.collected], side="left")
+        for band, count in enumerate(np.bincount(bands, minlength=len(CP_SUM_BAND_LABELS))):
+            features["cp_sum_counts"][band] += int(count)
+
+def cp_sum_band_counts(counts):
+    """Števci po pasovih; starejše datoteke imajo slovar z eno vrednostjo na vsako vsoto CP."""
+    if isinstance(counts, list):
+        return counts
+    bands = [0] * len(CP_SUM_BAND_LABELS)
+    for value, count in counts.items():
+        bands[bisect_left(CP_SUM_BANDS, float(value))] += count
+    return bands
+
+def merge_feature_stats(target, source):
+    target["freespins_played"] += source["freespins_played"]
+    for key in ("freespin_lengths", "state_spins", "cp_collections"):
+        for k, v in source[key].items():
+            add_count(target[key], k, v)
+    target["cp_sum_counts"] = [a + b for a, b in zip(cp_sum_band_counts(target["cp_sum_counts"]),
+                                                     cp_sum_band_counts(source["cp_sum_counts"]))]
+
+def feature_report(history):
+    """Bonus statistika za poročilo, če števci pokrivajo vse igre zgodovine (starejše datoteke jih nimajo)."""
+    features = history.get("feature_stats")
+    if not features or features["state_spins"]["base"] != history["total_games"]:
+        return None
+    triggers = sum(features["freespin_lengths"].values())
+    freespins = features["freespins_played"]
+    cp_sum_counts = cp_sum_band_counts(features["cp_sum_counts"])
+    collections = sum(cp_sum_counts)
+    avg_bet = history["total_bet"] / history["total_games"]
+    return {
+        "freespins_played": freespins,
+        "avg_freespins_per_trigger": round(freespins / triggers, 5) if triggers else 0.0,
+        "freespin_length_distribution": {
+            k: round(v / triggers, 8) for k, v in sorted(features["freespin_lengths"].items(), key=lambda kv: int(kv[0]))
+        },
+        "avg_bonus_payout_per_trigger": round(history["bonus_payout"] / triggers / avg_bet, 5) if triggers else 0.0,
+        "cp_collection_frequency": {
+            state: round(features["cp_collections"].get(state, 0) / spins, 8) if spins else 0.0
+            for state, spins in features["state_spins"].items()
+        },
+        "cp_sum_distribution": {
+            label: round(count / collections, 8) if collections else 0.0
+            for label, count in zip(CP_SUM_BAND_LABELS, cp_sum_counts)
+        }
+    }
+
+def merge_stats(history, res, bet_amount):
+    """Prišteje delni rezultat ene naloge k skupni zgodovini."""
+    history["total_games"] += res["total_games"]
+    history["total_bet"] += (res["total_games"] * bet_amount)
+    history["total_payout"] += res["total_payout"]
+    history["base_payout"] += res["base_payout"]
+    history["bonus_payout"] += res["bonus_payout"]
+    history["bonus_triggers"] += res["bonus_triggers"]
+    history["winning_spins"] += res["winning_spins"]
+    history["sum_payout_squares"] += res["sum_payout_squares"]
+
+    for sym, val in res["symbol_payouts"].items():
+        history["symbol_payouts"][sym] = history["symbol_payouts"].get(sym, 0.0) + val
+
+    stats = PayoutStats.from_dict(history.get("payout_stats"))
+    history["payout_stats"] = stats.merge(PayoutStats.from_dict(res["payout_stats"])).to_dict()
+    merge_feature_stats(history.setdefault("feature_stats", new_feature_stats()), res["feature_stats"])
+    if "strata" in res and "stratification" in history:
+        strat = history["stratification"]
+        if "strata" in strat:
+            strat["strata"] = [
+                CovarianceStats.from_dict(a).merge(CovarianceStats.from_dict(b)).to_dict()
+                for a, b in zip(strat["strata"], res["strata"])
+            ]
+        else:
+            strat["strata"] = res["strata"]
+    if "stage_profile" in res:
+        StageProfiler.merge(history.setdefault("stage_profile", {}), res["stage_profile"])
+
+def history_payout_stats(history):
+    """Združena statistika multiplikatorjev, če pokriva vse igre zgodovine (starejše datoteke je nimajo)."""
+    stats = PayoutStats.from_dict(history.get("payout_stats"))
+    return stats if stats.n == history["total_games"] and stats.n > 0 else None
+
+def confidence_margin(history):
+    """Vrne povprečni multiplikator, standardni odklon in polovično širino 95% intervala zaupanja."""
+    n = history["total_games"]
+    estimate = stratified_estimate(history)
+    if estimate is not None:
+        return estimate["rtp"], estimate["std_dev"], estimate["margin"]
+    avg_multiplier = history["total_payout"] / history["total_bet"]
+    stats = history_payout_stats(history)
+    if stats is not None:
+        std_dev = stats.std_dev
+    else:
+        # Starejše zgodovine brez sprotne statistike: naivna formula iz vsote kvadratov.
+        variance = (history["sum_payout_squares"] / n) - (avg_multiplier ** 2)
+        std_dev = math.sqrt(max(0, variance))
+    return avg_multiplier, std_dev, 1.96 * (std_dev / math.sqrt(n))
+
+def atomic_write(path, write, mode="w", **open_kwargs):
+    """Zapiše datoteko prek začasne datoteke in os.replace, da ob sesutju ne ostane pokvarjena."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode, **open_kwargs) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def checkpoint_path_for(abs_path):
+    return abs_path.replace(".json", "_checkpoint.json")
+
+def save_checkpoint(path, history, abs_path, rtp_path):
+    checkpoint = {"history": history, "abs_path": abs_path, "rtp_path": rtp_path}
+    atomic_write(path, lambda f: json.dump(checkpoint, f), encoding='utf-8')
+
+def _terminate_executor(executor):
+    """Ustavi delovne procese brez čakanja na naloge v teku (ProcessPoolExecutor pred Pythonom 3.14 nima javnega API-ja)."""
+    if hasattr(executor, "terminate_workers"):
+        executor.terminate_workers()
+        return
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+def run_chunks(task, make_args, indices, num_cores, pool_kwargs=None, on_broken=None):
+    """
+    Izvaja naloge task(*make_args(indeks)) v skupini procesov in sproti vrača (indeks, rezultat).
+    Hkrati je poslanih največ num_cores * TASKS_PER_CORE nalog, zato je zgodnja ustavitev poceni.
+    Če delovni proces umre (npr. OOM, SIGKILL), se pokliče on_broken(), skupina procesov se zamenja in
+    nedokončane naloge se pošljejo ponovno; enako se ponovi naloga, ki je vrnila None (napaka v procesu).
+    Po MAX_CHUNK_RETRIES ponovitvah se vrne (indeks, None). Ko klicatelj zanko prekine (close()),
+    se delovni procesi takoj ustavijo, rezultati nalog v teku pa zavržejo.
+    """
+    pending = deque(indices)
+    retries = {}
+    in_flight = {}
+    executor = None
+
+    def retry(chunk_index):
+        retries[chunk_index] = retries.get(chunk_index, 0) + 1
+        if retries[chunk_index] > MAX_CHUNK_RETRIES:
+            return False
+        pending.appendleft(chunk_index)
+        return True
+
+    try:
+        while pending or in_flight:
+            if executor is None:
+                executor = ProcessPoolExecutor(num_cores, **(pool_kwargs or {}))
+            while pending and len(in_flight) < num_cores * TASKS_PER_CORE:
+                chunk_index = pending.popleft()
+                in_flight[executor.submit(task, *make_args(chunk_index))] = chunk_index
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            broken = False
+            for future in done:
+                try:
+                    res = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                except Exception as e:
+                    print(f"Napaka pri nalogi {in_flight[future]}: {e}")
+                    res = None
+                chunk_index = in_flight.pop(future)
+                if not res and retry(chunk_index):
+                    print(f"Opozorilo: naloga {chunk_index} ni uspela, ponavljam jo.", flush=True)
+                    continue
+                yield chunk_index, res
+
+            if broken:
+                # Seme + indeks naloge določata stanje RNG, zato ponovljena naloga da enak rezultat.
+                lost = sorted(in_flight.values())
+                in_flight.clear()
+                executor.shutdown(wait=True, cancel_futures=True)
+                executor = None
+                if on_broken is not None:
+                    on_broken()
+                print(f"Opozorilo: delovni proces se je nepričakovano končal, ponavljam naloge {lost}.", flush=True)
+                for chunk_index in reversed(lost):
+                    if not retry(chunk_index):
+                        yield chunk_index, None
+    finally:
+        if executor is not None:
+            if in_flight:
+                _terminate_executor(executor)
+            else:
+                executor.shutdown(wait=True)
+
+def run_simulation(total_games, bet_amount, num_cores=1, existing_filename=None, engine="scalar", seed=None,
+                   chunk_size=None, target_ci=None, resume_checkpoint=None, profile=False, shared_model=True):
+    """
+    Simulacija razdeljena na številne manjše naloge (run_chunks: ProcessPoolExecutor z omejenim številom
+    poslanih nalog in ponovitvijo izgubljenih), ki se sproti združujejo.
+    Če je podan target_ci, se tek ustavi, ko je polovična širina 95% intervala zaupanja za RTP manjša.
+    Zgodovina se periodično shrani v kontrolno točko; resume_checkpoint nadaljuje prekinjen tek
+    z istim semenom in le še neopravljenimi nalogami (seme + indeks naloge določata stanje RNG).
+    profile=True izmeri čas po fazah vrtljaja v vseh procesih in ga zapiše v <ime>_profile.json.
+    Pri shared_model=True glavni proces model objavi v deljenem pomnilniku in delovni procesi se nanj le priklopijo.
+    """
     if num_cores > mp.cpu_count() or num_cores < 1:
         num_cores = max(1, mp.cpu_count() - 2)
-    games_per_core = max(1, total_games // num_cores)
+
+    # Config se preveri (in model prevede v predpomnilnik), preden se zaženejo delovni procesi.
+    try:
+        _load_worker_model()
+    except ConfigError as e:
+        print(f"Napaka: {e}")
+        return
     
     if not os.path.exists("simulations"):
         os.makedirs("simulations")
 
-    if existing_filename:
+    if resume_checkpoint:
+        with open(os.path.join("simulations", resume_checkpoint), "r", encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        history = checkpoint["history"]
+        abs_path, rtp_path = checkpoint["abs_path"], checkpoint["rtp_path"]
+        run_info = history["runs"][-1]
+        total_games, bet_amount = run_info["total_games"], run_info["bet_amount"]
+        engine, seed, chunk_size = run_info["engine"], run_info["seed"], run_info["chunk_size"]
+        profile = run_info.get("profile", False)
+        print(f"Nadaljujem s kontrolne točke: {resume_checkpoint} ({run_info['games']}/{total_games} iger)")
+    elif existing_filename:
         abs_path = os.path.join("simulations", existing_filename)
         rtp_path = abs_path.replace(".json", "_RTP.json")
     else:
@@ -73,7 +484,7 @@ def run_simulation(total_games, bet_amount, num_cores=1, existing_filename=None)
         abs_path = os.path.join("simulations", base_name)
         rtp_path = os.path.join("simulations", f"simulacija_{timestamp}_RTP_{total_games}.json")
 
-    if os.path.exists(abs_path):
+    if os.path.exists(abs_path) and not resume_checkpoint:
         print(f"Nadaljujem simulacijo v datoteki: {abs_path}")
         with open(abs_path, "r", encoding='utf-8') as f:
             data = json.load(f)
@@ -82,7 +493,7 @@ def run_simulation(total_games, bet_amount, num_cores=1, existing_filename=None)
                 history = data["history"]
             else:
                 history = data
-    else:
+    elif not resume_checkpoint:
         print(f"Ustvarjam novo simulacijo: {abs_path}")
         history = {
             "total_games": 0, "total_bet": 0.0, "total_payout": 0.0,
@@ -90,39 +501,85 @@ def run_simulation(total_games, bet_amount, num_cores=1, existing_filename=None)
             "winning_spins": 0, "sum_payout_squares": 0.0, "symbol_payouts": {}
         }
     
-    print(f"Izvajam {total_games} iger na {num_cores} jedrih...")
-    with mp.Pool(processes=num_cores) as pool:
-        tasks = [(games_per_core, bet_amount) for _ in range(num_cores)]
-        new_results = pool.starmap(worker_task, tasks)
-
-    for res in new_results:
-        if not res: continue
-        history["total_games"] += res["total_games"]
-        history["total_bet"] += (res["total_games"] * bet_amount)
-        history["total_payout"] += res["total_payout"]
-        history["base_payout"] += res["base_payout"]
-        history["bonus_payout"] += res["bonus_payout"]
-        history["bonus_triggers"] += res["bonus_triggers"]
-        history["winning_spins"] += res["winning_spins"]
-        history["sum_payout_squares"] += res["sum_payout_squares"]
-        
-        for sym, val in res["symbol_payouts"].items():
-            history["symbol_payouts"][sym] = history["symbol_payouts"].get(sym, 0.0) + val
+    if not resume_checkpoint:
+        # Glavno seme: ob None se ustvari naključno in zapiše v poročilo, da je tek ponovljiv.
+        seed = np.random.SeedSequence(seed).entropy
+        chunk_size = max(1, chunk_size or CHUNK_SIZES.get(engine, CHUNK_SIZES["scalar"]))
+        run_info = {
+            "seed": seed, "chunk_size": chunk_size, "engine": engine, "total_games": total_games,
+            "bet_amount": bet_amount, "games": 0, "stopped_early": False, "profile": profile,
+            "completed_chunks": []
+        }
+        history.setdefault("runs", []).append(run_info)
+        if engine == "stratified" and "stratification" not in history:
+            _, model = _load_worker_model()
+            history["stratification"] = control_means(model)
+
+    num_chunks = math.ceil(total_games / chunk_size)
+    completed = set(run_info["completed_chunks"])
+    checkpoint_path = checkpoint_path_for(abs_path)
+    failed_chunks = []
+    games_done = run_info["games"]
+    games_at_start = games_done
+    start_time = last_print = last_checkpoint = time.time()
+
+    print(f"Izvajam {total_games} iger v {num_chunks} nalogah na {num_cores} jedrih (seme {seed})...")
+    shared = SharedModel.publish(*_load_worker_model()) if shared_model else None
+    pool_kwargs = {"initializer": _attach_worker_model, "initargs": (shared.descriptor,)} if shared else {}
+    def chunk_args(i):
+        return min(chunk_size, total_games - i * chunk_size), bet_amount, engine, seed, i, profile
+    # Ko delovni proces umre, se pred ponovitvijo nalog shrani kontrolna točka.
+    results = run_chunks(worker_task, chunk_args, (i for i in range(num_chunks) if i not in completed), num_cores,
+                         pool_kwargs, on_broken=lambda: save_checkpoint(checkpoint_path, history, abs_path, rtp_path))
+    with shared or contextlib.nullcontext(), contextlib.closing(results):
+        for chunk_index, res in results:
+            if not res:
+                failed_chunks.append(chunk_index)
+                continue
+            merge_stats(history, res, bet_amount)
+            games_done += res["total_games"]
+            run_info["games"] = games_done
+            run_info["completed_chunks"].append(chunk_index)
+
+            now = time.time()
+            if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+                last_checkpoint = now
+                save_checkpoint(checkpoint_path, history, abs_path, rtp_path)
+            avg_multiplier, _, margin = confidence_margin(history)
+            reached_target = target_ci is not None and margin <= target_ci
+            if now - last_print >= PROGRESS_INTERVAL or games_done == total_games or reached_target:
+                last_print = now
+                rate = (games_done - games_at_start) / max(now - start_time, 1e-9)
+                eta = timedelta(seconds=round((total_games - games_done) / rate)) if rate else "?"
+                print(f"  {games_done}/{total_games} iger ({100 * games_done / total_games:.1f}%), "
+                      f"{rate:,.0f} iger/s, ETA {eta}, RTP {avg_multiplier:.5f} ± {margin:.5f}", flush=True)
+            if reached_target:
+                # Naloge v teku se zavržejo (run_chunks ob zaprtju ustavi procese); nadaljevanje jih ponovi.
+                print(f"Dosežena ciljna natančnost ±{target_ci}, simulacijo ustavljam.")
+                run_info["stopped_early"] = True
+                break
+
+    run_info["completed_chunks"].sort()
+    if failed_chunks:
+        run_info["failed_chunks"] = sorted(failed_chunks)
+        print(f"Opozorilo: {len(failed_chunks)} nalog ni uspelo: {sorted(failed_chunks)}")
+    save_checkpoint(checkpoint_path, history, abs_path, rtp_path)
+    if not failed_chunks:
+        # Seznam opravljenih nalog je potreben le za nadaljevanje s kontrolne točke.
+        del run_info["completed_chunks"]
 
     def to_rtp(value):
         return round((value / total_bet), 5)
 
     n = history["total_games"]
     total_bet = history["total_bet"]
-    avg_multiplier = history["total_payout"] / total_bet
-    variance = (history["sum_payout_squares"] / n) - (avg_multiplier ** 2)
-    std_dev = math.sqrt(max(0, variance))
     # Interval zaupanja za 95% zaupanje
-    margin_of_error = 1.96 * (std_dev / math.sqrt(n))
+    avg_multiplier, std_dev, margin_of_error = confidence_margin(history)
     lower = round((avg_multiplier - margin_of_error), 4)
     upper = round((avg_multiplier + margin_of_error), 4)
     report = {
         "timestamp_last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "seed": seed,
         "total_games": n,
         "total_bet": total_bet,
         "total_payout_rtp": to_rtp(history['total_payout']),
@@ -135,30 +592,104 @@ def run_simulation(total_games, bet_amount, num_cores=1, existing_filename=None)
         "symbol_payouts_rtp": {sym: to_rtp(val) for sym, val in history["symbol_payouts"].items()},
         "confidence_interval 95%": [lower, upper]
     }
+    stats = history_payout_stats(history)
+    if stats is not None:
+        report["volatility_index"] = round(stats.volatility_index, 5)
+        report["skewness"] = round(stats.skewness, 5)
+        report["excess_kurtosis"] = round(stats.excess_kurtosis, 5)
+        report["win_band_probabilities"] = {band: round(p, 8) for band, p in stats.band_probabilities().items()}
+        report["max_win_multiplier"] = round(stats.max, 4)
+    bonus_statistics = feature_report(history)
+    if bonus_statistics is not None:
+        report["bonus_statistics"] = bonus_statistics
+    estimate = stratified_estimate(history)
+    if estimate is not None:
+        # Interval zaupanja zgoraj je že iz tega ocenjevalca; tukaj še dosežena redukcija variance.
+        report["stratified_estimator"] = {
+            "rtp_estimate": round(estimate["rtp"], 6),
+            "standard_error": round(math.sqrt(estimate["variance_control_variates"]), 7),
+            "plain_standard_error": round(math.sqrt(estimate["variance_plain"]), 7),
+            "variance_reduction_stratification": round(estimate["variance_plain"] / estimate["variance_stratified"], 3),
+            "variance_reduction": round(estimate["variance_plain"] / estimate["variance_control_variates"], 3)
+            if estimate["variance_control_variates"] > 0 else None,
+            "control_coefficients": {k: round(v, 6) for k, v in estimate["control_coefficients"].items()},
+        }
     combined = {"history": history, "report": report}
-    with open(rtp_path, "w") as f:
-        json.dump(combined, f, indent=4)
+    atomic_write(rtp_path, lambda f: json.dump(combined, f, indent=4))
 
-    csv_path = abs_path.replace(".json", ".csv")
-    with open(csv_path, mode='w', newline='', encoding='utf-8-sig') as f:
+    def write_csv(f):
         writer = csv.writer(f)
         writer.writerow(["Parameter", "Vrednost"])
         writer.writerow(["Skupni RTP", report["total_payout_rtp"]])
         writer.writerow(["Standardni odklon", report["standard_deviation"]])
         writer.writerow(["Hit Frequency", report["hit_frequency"]])
         writer.writerow(["Bonus Trigger", report["bonus_trigger_hitrate"]])
+        if "stratified_estimator" in report:
+            writer.writerow(["RTP (stratificiran ocenjevalec)", report["stratified_estimator"]["rtp_estimate"]])
+            writer.writerow(["Redukcija variance", report["stratified_estimator"]["variance_reduction"]])
+        if "volatility_index" in report:
+            writer.writerow(["Indeks volatilnosti", report["volatility_index"]])
+            writer.writerow(["Asimetrija", report["skewness"]])
+            writer.writerow(["Presežna sploščenost", report["excess_kurtosis"]])
         writer.writerow([])
         writer.writerow(["Simbol", "RTP %"])
         for sym, val in report["symbol_payouts_rtp"].items():
             writer.writerow([sym, val])
+        if "max_win_multiplier" in report:
+            writer.writerow(["Največji dobitek (x stava)", report["max_win_multiplier"]])
+        if "bonus_statistics" in report:
+            bonus = report["bonus_statistics"]
+            writer.writerow([])
+            writer.writerow(["Bonus funkcije", "Vrednost"])
+            writer.writerow(["Odigrani brezplačni vrtljaji", bonus["freespins_played"]])
+            writer.writerow(["Povp. brezplačnih vrtljajev na sprožitev", bonus["avg_freespins_per_trigger"]])
+            writer.writerow(["Povp. bonus dobitek na sprožitev (x stava)", bonus["avg_bonus_payout_per_trigger"]])
+            for state, freq in bonus["cp_collection_frequency"].items():
+                writer.writerow([f"Pogostost CP collection ({state})", freq])
+            writer.writerow([])
+            writer.writerow(["Dolžina brezplačnih vrtljajev", "Verjetnost"])
+            for length, p in bonus["freespin_length_distribution"].items():
+                writer.writerow([length, p])
+            writer.writerow([])
+            writer.writerow(["Pas vsote CP", "Verjetnost"])
+            for value, p in bonus["cp_sum_distribution"].items():
+                writer.writerow([value, p])
+        if "win_band_probabilities" in report:
+            writer.writerow([])
+            writer.writerow(["Pas dobitka", "Verjetnost"])
+            for band, p in report["win_band_probabilities"].items():
+                writer.writerow([band, p])
+
+    csv_path = abs_path.replace(".json", ".csv")
+    atomic_write(csv_path, write_csv, newline='', encoding='utf-8-sig')
+    if profile and history.get("stage_profile"):
+        breakdown = StageProfiler.breakdown(history["stage_profile"])
+        profile_path = rtp_path.replace(".json", "_profile.json")
+        atomic_write(profile_path, lambda f: json.dump({"engine": engine, "stages": breakdown}, f, indent=4))
+    # Tek je zaključen in poročilo zapisano, kontrolna točka ni več potrebna (razen ob neuspelih nalogah).
+    if not failed_chunks and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
 
     print(f"\n--- KONČANO ---")
     print(f"Podatki shranjeni v: {abs_path}")
     print(f"Skupni RTP: {report['total_payout_rtp']}")
+    if profile and history.get("stage_profile"):
+        print(f"Čas po fazah (lastni čas, shranjeno v {profile_path}):")
+        for stage, values in breakdown.items():
+            print(f"  {stage}: {values['self_share']:.1%} ({values['us_per_call']} µs/klic, {values['calls']} klicev)")
 
 if __name__ == "__main__":
     # Za novo simulacijo:
     #run_simulation(total_games=5000, num_cores=6, bet_amount=1.0)
+    # Vektorizirano (NumPy) za zelo velike simulacije:
+    #run_simulation(total_games=1_000_000_000, num_cores=6, bet_amount=1.0, engine="batch")
+    # Z ustavitvijo, ko je 95% interval zaupanja za RTP ožji od ±0.001:
+    #run_simulation(total_games=1_000_000_000, num_cores=6, bet_amount=1.0, engine="batch", target_ci=0.001)
+    # Stratificirano po setih kolutov s kontrolnimi spremenljivkami (ožji interval pri enakem številu iger):
+    #run_simulation(total_games=1_000_000_000, num_cores=6, bet_amount=1.0, engine="stratified", target_ci=0.001)
     
+    # Za nadaljevanje prekinjenega teka s kontrolne točke (isto seme, točno število iger):
+    #run_simulation(total_games=0, bet_amount=1.0, resume_checkpoint="simulacija_20260119_003148_checkpoint.json")
+
     # Za nadaljevanje obstoječe:
     run_simulation(total_games=10000, bet_amount=1.0, existing_filename="simulacija_20260119_002836_RTP_5000.json")
\ No newline at end of file
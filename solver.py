@@ -0,0 +1,214 @@
+import json
+import os
+import sys
+import copy
+import math
+from datetime import datetime
+import numpy as np
+from main import GameModel, SlotMachine
+from calculator import calculate_exact_rtp
+from Classes.spinRng import SpinRNG
+from Classes.payoutStats import PayoutStats
+from simulator import BATCH_SIZE
+
+# Meje parametra nagiba (lambda) in natančnost bisekcije.
+TILT_RANGE = (-20.0, 20.0)
+RTP_TOLERANCE = 1e-7
+# Kandidati nagiba CP uteži pri iskanju sekundarnega cilja (zadetki / volatilnost).
+CP_TILT_GRID = np.linspace(-3.0, 3.0, 13)
+SECONDARY_METRICS = ("hit_frequency", "volatility_index")
+
+def tilt(weights, scores, lam, total=None):
+    """
+    Eksponentni nagib uteži: w_i * exp(lam * s_i), preveden nazaj v cela števila z enako vsoto.
+    Ničelne uteži ostanejo nič, pozitivne ostanejo vsaj 1 (porazdelitev ohrani nosilec).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    active = weights > 0
+    if not active.any():
+        return [int(w) for w in weights]
+    shifted = np.where(active, lam * (scores - scores[active].max()), 0.0)
+    tilted = np.where(active, weights * np.exp(shifted), 0.0)
+    total = total if total is not None else weights.sum()
+    scaled = tilted / tilted.sum() * total
+    return [max(1, int(round(w))) if a else 0 for w, a in zip(scaled, active)]
+
+def reel_set_scores(config):
+    """RTP celotne igre, če bi se v osnovni igri vrtel samo posamezen set kolutov."""
+    scores = []
+    for i, rs in enumerate(config["base"]["reel_sets"]):
+        if rs["weight"] <= 0:
+            scores.append(0.0)
+            continue
+        single = copy.deepcopy(config)
+        for j, other in enumerate(single["base"]["reel_sets"]):
+            other["weight"] = 1 if j == i else 0
+        scores.append(calculate_exact_rtp(single)["total_rtp"])
+    return scores
+
+def apply_reel_set_tilt(config, lam, scores, total=None):
+    result = copy.deepcopy(config)
+    weights = [rs["weight"] for rs in config["base"]["reel_sets"]]
+    for rs, w in zip(result["base"]["reel_sets"], tilt(weights, scores, lam, total)):
+        rs["weight"] = w
+    return result
+
+def apply_cp_tilt(config, lam, total=None):
+    """Nagne CPWeights v vseh stanjih proti višjim (lam > 0) ali nižjim (lam < 0) vrednostim."""
+    result = copy.deepcopy(config)
+    for state in result.values():
+        cp_weights = state.get("customParameters", {}).get("CPWeights")
+        if not cp_weights:
+            continue
+        labels = list(cp_weights)
+        values = [float(label) for label in labels]
+        tilted = tilt([cp_weights[label] for label in labels], np.array(values) / max(values), lam, total)
+        state["customParameters"]["CPWeights"] = dict(zip(labels, tilted))
+    return result
+
+def bisect_tilt(make_config, target_rtp):
+    """Poišče nagib, pri katerem je točen RTP enak ciljnemu (RTP je v nagibu monotono naraščajoč)."""
+    lo, hi = TILT_RANGE
+    rtp_lo = calculate_exact_rtp(make_config(lo))["total_rtp"]
+    rtp_hi = calculate_exact_rtp(make_config(hi))["total_rtp"]
+    if not rtp_lo <= target_rtp <= rtp_hi:
+        raise ValueError(f"Ciljni RTP {target_rtp} ni dosegljiv s tem parametrom (razpon {rtp_lo:.5f} - {rtp_hi:.5f}).")
+    best = None
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        config = make_config(mid)
+        rtp = calculate_exact_rtp(config)["total_rtp"]
+        if best is None or abs(rtp - target_rtp) < abs(best[2] - target_rtp):
+            best = (mid, config, rtp)
+        if abs(rtp - target_rtp) < RTP_TOLERANCE or hi - lo < 1e-9:
+            break
+        if rtp < target_rtp:
+            lo = mid
+        else:
+            hi = mid
+    return best
+
+def simulate_metrics(config, games, seed, bet_amount=1.0):
+    """Vektorizirana simulacija za metrike brez analitične rešitve (zadetki, volatilnost) in interval zaupanja."""
+    model = GameModel.from_config(config)
+    machine = SlotMachine(reel_sets=[], window_height=config["base"]["window_height"], model=model, rng=SpinRNG(seed))
+    stats = PayoutStats()
+    winning = 0
+    remaining = games
+    while remaining > 0:
+        size = min(BATCH_SIZE, remaining)
+        remaining -= size
+        result = machine.play_batch(size, bet_amount)
+        stats.add_batch(result.totals / bet_amount)
+        winning += int((result.totals > 0).sum())
+    margin = 1.96 * stats.std_dev / math.sqrt(stats.n)
+    return {
+        "games": games,
+        "seed": seed,
+        "rtp": round(stats.mean, 6),
+        "confidence_interval 95%": [round(stats.mean - margin, 6), round(stats.mean + margin, 6)],
+        "hit_frequency": round(winning / games, 6),
+        "standard_deviation": round(stats.std_dev, 5),
+        "volatility_index": round(stats.volatility_index, 5),
+    }
+
+def solve_target_rtp(config, target_rtp, adjust="reel_sets", secondary=None, sim_games=2_000_000, seed=0,
+                     weight_total=None):
+    """
+    Prilagodi uteži setov kolutov (adjust="reel_sets") ali CPWeights (adjust="cp_weights"), da točen RTP
+    doseže cilj. Pri sekundarnem cilju, npr. secondary=("volatility_index", 9.0), se preiščejo nagibi CP uteži,
+    za vsakega se RTP izravna z utežmi setov, izbere pa se kandidat s simulirano metriko najbližje cilju
+    (vsi kandidati uporabijo isto seme).
+    """
+    if adjust not in ("reel_sets", "cp_weights"):
+        raise ValueError(f"Neznan parameter za prilagajanje: {adjust}")
+    if secondary is not None and secondary[0] not in SECONDARY_METRICS:
+        raise ValueError(f"Sekundarni cilj mora biti eden od {SECONDARY_METRICS}.")
+
+    cp_lam = None
+    if secondary is None and adjust == "cp_weights":
+        lam, solved, rtp = bisect_tilt(lambda l: apply_cp_tilt(config, l, weight_total), target_rtp)
+        cp_lam, rs_lam = lam, None
+        metrics = simulate_metrics(solved, sim_games, seed)
+    elif secondary is None:
+        scores = reel_set_scores(config)
+        rs_lam, solved, rtp = bisect_tilt(lambda l: apply_reel_set_tilt(config, l, scores, weight_total), target_rtp)
+        metrics = simulate_metrics(solved, sim_games, seed)
+    else:
+        metric, goal = secondary
+        best = None
+        for lam in CP_TILT_GRID:
+            candidate = apply_cp_tilt(config, lam, weight_total)
+            scores = reel_set_scores(candidate)
+            try:
+                rs_lam, solved, rtp = bisect_tilt(lambda l: apply_reel_set_tilt(candidate, l, scores, weight_total), target_rtp)
+            except ValueError:
+                continue
+            metrics = simulate_metrics(solved, sim_games, seed)
+            print(f"  CP nagib {lam:+.2f}: RTP {rtp:.5f}, {metric} {metrics[metric]}")
+            if best is None or abs(metrics[metric] - goal) < abs(best[4][metric] - goal):
+                best = (lam, rs_lam, solved, rtp, metrics)
+        if best is None:
+            raise ValueError(f"Ciljni RTP {target_rtp} ni dosegljiv pri nobenem nagibu CP uteži.")
+        cp_lam, rs_lam, solved, rtp, metrics = best
+
+    exact = calculate_exact_rtp(solved)
+    report = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "target_rtp": target_rtp,
+        "exact_rtp": exact["total_rtp"],
+        "rtp_error": exact["total_rtp"] - target_rtp,
+        "bonus_trigger_probability": exact["bonus_trigger_probability"],
+        "adjusted": adjust if secondary is None else "cp_weights+reel_sets",
+        "reel_set_tilt": rs_lam,
+        "cp_tilt": cp_lam,
+        "reel_set_weights": [rs["weight"] for rs in solved["base"]["reel_sets"]],
+        "cp_weights": {name: state["customParameters"]["CPWeights"]
+                       for name, state in solved.items() if state.get("customParameters", {}).get("CPWeights")},
+        "simulation": metrics,
+    }
+    if secondary is not None:
+        report["secondary_target"] = {"metric": secondary[0], "target": secondary[1], "achieved": metrics[secondary[0]]}
+    return solved, report
+
+def main():
+    # Uporaba: python solver.py <ciljni_rtp> [reel_sets|cp_weights] [hit_frequency|volatility_index <vrednost>]
+    try:
+        with open("config.json", "r", encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print("Napaka: Datoteka config.json ni bila najdena.")
+        return
+
+    target_rtp = float(sys.argv[1]) if len(sys.argv) > 1 else 0.94
+    adjust = sys.argv[2] if len(sys.argv) > 2 else "reel_sets"
+    secondary = (sys.argv[3], float(sys.argv[4])) if len(sys.argv) > 4 else None
+
+    print(f"Iščem uteži za ciljni RTP {target_rtp} ({adjust if secondary is None else f'{secondary[0]} = {secondary[1]}'})...")
+    try:
+        solved, report = solve_target_rtp(config, target_rtp, adjust, secondary)
+    except ValueError as e:
+        print(f"Napaka: {e}")
+        return
+
+    if not os.path.exists("calculations"):
+        os.makedirs("calculations")
+    config_path = os.path.join("calculations", f"config_rtp_{target_rtp * 100:.2f}.json")
+    with open(config_path, "w", encoding='utf-8') as f:
+        json.dump(solved, f, indent=2, ensure_ascii=False)
+    report["config"] = config_path
+    report_path = config_path.replace(".json", "_report.json")
+    with open(report_path, "w", encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+
+    sim = report["simulation"]
+    print(f"\n--- REZULTAT ---")
+    print(f"Točen RTP: {report['exact_rtp']:.6f} (cilj {target_rtp}, napaka {report['rtp_error']:+.2e})")
+    print(f"Simuliran RTP: {sim['rtp']:.5f}, 95% interval {sim['confidence_interval 95%']}")
+    print(f"Hit Frequency: {sim['hit_frequency']}, indeks volatilnosti: {sim['volatility_index']}")
+    print(f"Uteži setov kolutov: {report['reel_set_weights']}")
+    print(f"Config shranjen v: {config_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import json
+import csv
+import os
+import copy
+import math
+import time
+import hashlib
+import multiprocessing as mp
+from datetime import datetime, timedelta
+import numpy as np
+from main import GameModel
+from Classes.spinRng import SpinRNG
+from Classes.payoutStats import PayoutStats
+from Classes.batchSpin import BatchTables, BatchResult, GameBatchResult, windows_from_uniforms, cp_index_from_uniforms
+from Classes.configLoader import ConfigError, validate_config
+from simulator import BATCH_SIZE, PROGRESS_INTERVAL, atomic_write, run_chunks
+
+# Privzeto število iger v eni nalogi (vse različice se ocenijo na istih igrah).
+SWEEP_CHUNK_SIZE = 1_000_000
+REFERENCE_NAME = "reference"
+
+def apply_overrides(config, overrides):
+    """
+    Vrne kopijo configa s prepisanimi vrednostmi. Slovarji se združujejo rekurzivno,
+    elemente seznamov naslovimo z indeksom, npr. {"base": {"reel_sets": {"0": {"weight": 2459}}}}.
+    """
+    result = copy.deepcopy(config)
+    _merge_into(result, overrides)
+    return result
+
+def _merge_into(target, overrides):
+    for key, value in overrides.items():
+        k = int(key) if isinstance(target, list) else key
+        current = target[k] if isinstance(target, list) or k in target else None
+        if isinstance(value, dict) and isinstance(current, (dict, list)):
+            _merge_into(current, value)
+        else:
+            target[k] = value
+
+
+class SweepVariant:
+    """Ena različica modela v preletu: ime, prepisane vrednosti in preveden model."""
+    def __init__(self, name: str, overrides: dict, config: dict) -> None:
+        self.name: str = name
+        self.overrides: dict = overrides
+        self.model: GameModel = GameModel.from_config(apply_overrides(config, overrides))
+        # Različice z enakimi koluti in utežmi setov si delijo okna (ključ po vsebini tabel).
+        self.reel_keys: dict[str, str] = {}
+        for state in self.model.states:
+            t = self.tables(state)
+            digest = hashlib.sha1()
+            for array in (t.columns, t.reel_lengths, t.reel_set_cdf):
+                digest.update(array.tobytes())
+            self.reel_keys[state] = digest.hexdigest()
+
+    def tables(self, state: str) -> BatchTables:
+        return self.model.get_state(state).get_batch_tables()
+
+
+_worker_cache = {}
+
+def _load_variants(config_path, variant_specs):
+    key = (config_path, json.dumps(variant_specs, sort_keys=True))
+    if _worker_cache.get("key") != key:
+        with open(config_path, "r", encoding='utf-8') as f:
+            config = json.load(f)
+        _worker_cache["key"] = key
+        _worker_cache["variants"] = [SweepVariant(v["name"], v.get("overrides", {}), config) for v in variant_specs]
+    return _worker_cache["variants"]
+
+def _score_state(variants, state, bet, u_reel_set, u_stops, u_cp, masks=None):
+    """Oceni iste naključne številke v vseh različicah; okna se zgradijo enkrat na skupino kolutov."""
+    windows_cache = {}
+    results = []
+    for i, variant in enumerate(variants):
+        tables = variant.tables(state)
+        mask = masks[i] if masks is not None else None
+        cached = windows_cache.get(variant.reel_keys[state], [])
+        drawn = next((w for m, w in cached if (m is None and mask is None)
+                      or (m is not None and mask is not None and np.array_equal(m, mask))), None)
+        if drawn is None:
+            if mask is None:
+                drawn = windows_from_uniforms(tables, u_reel_set, u_stops)
+            else:
+                drawn = windows_from_uniforms(tables, u_reel_set[mask], u_stops[mask])
+            cached.append((mask, drawn))
+            windows_cache[variant.reel_keys[state]] = cached
+        reel_set_index, stops, windows = drawn
+        cp_index = cp_index_from_uniforms(tables, windows, u_cp if mask is None else u_cp[mask])
+        results.append(BatchResult(tables, bet, reel_set_index, stops, windows, cp_index))
+    return results
+
+def play_common(variants, n, bet, rng):
+    """
+    Odigra N iger v vseh različicah na skupnih naključnih številih.
+    Vsaka igra ima vnaprej izžrebane številke za največje število brezplačnih vrtljajev med različicami,
+    posamezna različica uporabi le toliko prvih, kolikor vrtljajev je sama podelila.
+    """
+    base_tables = [v.tables("base") for v in variants]
+    width, height = base_tables[0].width, base_tables[0].height
+    if any(t.width != width or t.height != height for t in base_tables):
+        raise ValueError("Vse različice morajo imeti enako velikost okna.")
+    bases = _score_state(variants, "base", bet, rng.random(n), rng.random((n, width)), rng.random((n, height, width)))
+
+    awarded = np.array([np.where(b.triggered, b.trigger_spins, 0) for b in bases])
+    max_awarded = awarded.max(axis=0)
+    slots = int(max_awarded.sum())
+    game_index = np.repeat(np.arange(n), max_awarded)
+    slot = np.arange(slots) - np.repeat(np.cumsum(max_awarded) - max_awarded, max_awarded)
+
+    freespin_variants = [i for i, v in enumerate(variants) if "freespins" in v.model]
+    freespins = [None] * len(variants)
+    if slots and freespin_variants:
+        fs_tables = variants[freespin_variants[0]].tables("freespins")
+        fs_width, fs_height = fs_tables.width, fs_tables.height
+        u_reel_set, u_stops = rng.random(slots), rng.random((slots, fs_width))
+        u_cp = rng.random((slots, fs_height, fs_width))
+        masks = [slot < awarded[i][game_index] for i in freespin_variants]
+        scored = _score_state([variants[i] for i in freespin_variants], "freespins", bet,
+                              u_reel_set, u_stops, u_cp, masks)
+        for i, mask, result in zip(freespin_variants, masks, scored):
+            freespins[i] = (result, game_index[mask])
+
+    empty = np.zeros(0, dtype=np.int64)
+    return [
+        GameBatchResult(base, fs[0] if fs else None, fs[1] if fs else empty)
+        for base, fs in zip(bases, freespins)
+    ]
+
+def new_variant_stats():
+    return {
+        "total_payout": 0.0, "base_payout": 0.0, "bonus_payout": 0.0,
+        "winning_spins": 0, "bonus_triggers": 0,
+        "payout_stats": PayoutStats().to_dict(), "difference_stats": PayoutStats().to_dict()
+    }
+
+def sweep_task(num_games, bet_amount, variant_specs, seed, chunk_index, config_path="config.json"):
+    try:
+        variants = _load_variants(config_path, variant_specs)
+        rng = SpinRNG.for_worker(seed, chunk_index).generator
+        payout_stats = [PayoutStats() for _ in variants]
+        difference_stats = [PayoutStats() for _ in variants]
+        stats = [new_variant_stats() for _ in variants]
+
+        remaining = num_games
+        while remaining > 0:
+            size = min(BATCH_SIZE, remaining)
+            remaining -= size
+            games = play_common(variants, size, bet_amount, rng)
+            reference = games[0].totals / bet_amount
+            for i, g in enumerate(games):
+                s = stats[i]
+                s["total_payout"] += float(g.totals.sum())
+                s["base_payout"] += float(g.base_payouts.sum())
+                s["bonus_payout"] += float(g.bonus_payouts.sum())
+                s["winning_spins"] += int((g.totals > 0).sum())
+                s["bonus_triggers"] += int(g.triggered.sum())
+                multipliers = g.totals / bet_amount
+                payout_stats[i].add_batch(multipliers)
+                # Razlika do referenčne različice na isti igri (parni vzorec).
+                difference_stats[i].add_batch(multipliers - reference)
+
+        for s, p, d in zip(stats, payout_stats, difference_stats):
+            s["payout_stats"] = p.to_dict()
+            s["difference_stats"] = d.to_dict()
+        return {"total_games": num_games, "variants": stats}
+    except Exception as e:
+        print(f"Napaka v delovnem procesu: {e}")
+        return None
+
+def merge_variant_stats(target, source):
+    for key in ("total_payout", "base_payout", "bonus_payout", "winning_spins", "bonus_triggers"):
+        target[key] += source[key]
+    for key in ("payout_stats", "difference_stats"):
+        target[key] = PayoutStats.from_dict(target[key]).merge(PayoutStats.from_dict(source[key])).to_dict()
+
+def variant_report(stats, reference, n, total_bet):
+    payout = PayoutStats.from_dict(stats["payout_stats"])
+    ref_payout = PayoutStats.from_dict(reference["payout_stats"])
+    difference = PayoutStats.from_dict(stats["difference_stats"])
+    margin = 1.96 * payout.std_dev / math.sqrt(n)
+    diff_margin = 1.96 * difference.std_dev / math.sqrt(n)
+    rtp = stats["total_payout"] / total_bet
+    report = {
+        "total_payout_rtp": round(rtp, 6),
+        "base_payout_rtp": round(stats["base_payout"] / total_bet, 6),
+        "bonus_payout_rtp": round(stats["bonus_payout"] / total_bet, 6),
+        "hit_frequency": round(stats["winning_spins"] / n, 6),
+        "bonus_trigger_frequency": round(stats["bonus_triggers"] / n, 6),
+        "standard_deviation": round(payout.std_dev, 5),
+        "volatility_index": round(payout.volatility_index, 5),
+        "confidence_interval 95%": [round(rtp - margin, 5), round(rtp + margin, 5)],
+        "rtp_difference": round(difference.mean, 6),
+        "rtp_difference_ci 95%": [round(difference.mean - diff_margin, 6), round(difference.mean + diff_margin, 6)],
+    }
+    # Koliko manjša je varianca razlike zaradi skupnih naključnih števil kot pri neodvisnih tekih.
+    if difference.variance > 0:
+        report["variance_reduction"] = round((payout.variance + ref_payout.variance) / difference.variance, 2)
+    return report
+
+def run_sweep(variants, total_games, bet_amount=1.0, num_cores=1, seed=None, chunk_size=None,
+              config_path="config.json"):
+    """
+    Prelet različic configa na skupnih naključnih številih (vektorizirano).
+    `variants` je seznam {"name": ..., "overrides": {...}}; referenčna različica (nespremenjen config)
+    se doda samodejno in je osnova za parne razlike RTP.
+    """
+    if num_cores > mp.cpu_count() or num_cores < 1:
+        num_cores = max(1, mp.cpu_count() - 2)
+    if not os.path.exists("simulations"):
+        os.makedirs("simulations")
+
+    variant_specs = [{"name": REFERENCE_NAME, "overrides": {}}] + [
+        {"name": v.get("name", f"variant_{i + 1}"), "overrides": v.get("overrides", {})} for i, v in enumerate(variants)
+    ]
+    # Različice se preverijo in prevedejo že tukaj, da se napake v overrides pokažejo pred zagonom procesov.
+    with open(config_path, "r", encoding='utf-8') as f:
+        config = json.load(f)
+    errors = [f"{spec['name']}: {e}" for spec in variant_specs
+              for e in validate_config(apply_overrides(config, spec["overrides"]))]
+    if errors:
+        print(f"Napaka: {ConfigError(errors, config_path)}")
+        return None
+    _load_variants(config_path, variant_specs)
+
+    seed = np.random.SeedSequence(seed).entropy
+    chunk_size = max(1, chunk_size or SWEEP_CHUNK_SIZE)
+    num_chunks = math.ceil(total_games / chunk_size)
+    def chunk_args(i):
+        return min(chunk_size, total_games - i * chunk_size), bet_amount, variant_specs, seed, i, config_path
+
+    totals = {"total_games": 0, "variants": [new_variant_stats() for _ in variant_specs]}
+    failed_chunks = []
+    start_time = last_print = time.time()
+
+    print(f"Prelet {len(variant_specs)} različic, {total_games} iger v {num_chunks} nalogah na {num_cores} jedrih (seme {seed})...")
+    for chunk_index, res in run_chunks(sweep_task, chunk_args, range(num_chunks), num_cores):
+        if not res:
+            failed_chunks.append(chunk_index)
+            continue
+        totals["total_games"] += res["total_games"]
+        for target, source in zip(totals["variants"], res["variants"]):
+            merge_variant_stats(target, source)
+        now = time.time()
+        if now - last_print >= PROGRESS_INTERVAL or totals["total_games"] == total_games:
+            last_print = now
+            rate = totals["total_games"] / max(now - start_time, 1e-9)
+            eta = timedelta(seconds=round((total_games - totals["total_games"]) / rate)) if rate else "?"
+            print(f"  {totals['total_games']}/{total_games} iger, {rate:,.0f} iger/s, ETA {eta}", flush=True)
+
+    n = totals["total_games"]
+    if n == 0:
+        print("Napaka: nobena naloga ni uspela.")
+        return None
+    total_bet = n * bet_amount
+    reference = totals["variants"][0]
+    result = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "seed": seed,
+        "total_games": n,
+        "bet_amount": bet_amount,
+        "config": config_path,
+        "variants": [
+            {"name": spec["name"], "overrides": spec["overrides"], "report": variant_report(stats, reference, n, total_bet)}
+            for spec, stats in zip(variant_specs, totals["variants"])
+        ]
+    }
+    if failed_chunks:
+        result["failed_chunks"] = sorted(failed_chunks)
+        print(f"Opozorilo: {len(failed_chunks)} nalog ni uspelo: {sorted(failed_chunks)}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join("simulations", f"sweep_{timestamp}.json")
+    atomic_write(json_path, lambda f: json.dump(result, f, indent=4, ensure_ascii=False), encoding='utf-8')
+
+    columns = ["total_payout_rtp", "rtp_difference", "hit_frequency", "bonus_trigger_frequency",
+               "standard_deviation", "variance_reduction"]
+    def write_csv(f):
+        writer = csv.writer(f)
+        writer.writerow(["Različica"] + columns + ["Razlika CI 95% spodaj", "Razlika CI 95% zgoraj"])
+        for v in result["variants"]:
+            r = v["report"]
+            writer.writerow([v["name"]] + [r.get(c, "") for c in columns] + r["rtp_difference_ci 95%"])
+    atomic_write(json_path.replace(".json", ".csv"), write_csv, newline='', encoding='utf-8-sig')
+
+    print(f"\n--- PRELET KONČAN ---")
+    for v in result["variants"]:
+        r = v["report"]
+        lo, hi = r["rtp_difference_ci 95%"]
+        print(f"{v['name']}: RTP {r['total_payout_rtp']:.5f}, razlika {r['rtp_difference']:+.5f} [{lo:+.5f}, {hi:+.5f}]")
+    print(f"Podatki shranjeni v: {json_path}")
+    return result
+
+if __name__ == "__main__":
+    run_sweep(
+        variants=[
+            {"name": "cp100_20", "overrides": {"base": {"customParameters": {"CPWeights": {"100": 20}}}}},
+            {"name": "threshold_6", "overrides": {"base": {"customParameters": {"threshold": 6}}}},
+            {"name": "excel_weights", "overrides": {"base": {"reel_sets": {"0": {"weight": 2459}}}}},
+        ],
+        total_games=10_000_000, bet_amount=1.0, num_cores=6
+    )
@@ -3,9 +3,38 @@ from tkinter import messagebox
 import json
 import os
 import random
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import customtkinter as ctk
 from PIL import Image, ImageTk
-from main import SlotMachine, load_symbols, load_reel_sets, spin_machine
+from main import SlotMachine, spin_machine
+from Classes.configLoader import ConfigWatcher
+from Classes.sessionLog import JsonFileSink
+
+# Največ pomanjšanih slik v predpomnilniku (vsi simboli v nekaj velikostih celic).
+IMAGE_CACHE_SIZE = 64
+# Med animacijo delovna nit že izračuna naslednji vrtljaj (za trenutno stavo).
+PREFETCH_SPINS = True
+
+class ImageCache:
+  """LRU predpomnilnik pomanjšanih slik simbolov s ključem (simbol, velikost)."""
+  def __init__(self, originals, max_items=IMAGE_CACHE_SIZE):
+    self.originals = originals
+    self.max_items = max_items
+    self.items = OrderedDict()
+
+  def get(self, sym, size):
+    key = (sym, size)
+    if key in self.items:
+      self.items.move_to_end(key)
+      return self.items[key]
+    tk_img = ImageTk.PhotoImage(self.originals[sym].resize(size, Image.LANCZOS))
+    self.items[key] = tk_img
+    # Izrinjena slika ostane živa, dokler jo celica še prikazuje (referenca v tk_images).
+    if len(self.items) > self.max_items:
+      self.items.popitem(last=False)
+    return tk_img
 
 class SlotMachineGUI:
   def __init__(self, root):
@@ -15,22 +44,29 @@ class SlotMachineGUI:
     self.root.minsize(525, 500)
     self.root.configure(bg="#474646")
     
-    with open("config.json", "r", encoding='utf-8') as f:
-      self.config = json.load(f)
+    # Config se ob spremembi datoteke ponovno naloži pred naslednjim vrtljajem (v Tk niti, glej reload_config).
+    self.config_watcher = ConfigWatcher("config.json")
+    self.config = self.config_watcher.config
     with open("rules.txt", "r", encoding="utf-8") as f:
       rules_text = f.read()
 
-    base_cfg = self.config["base"]
-    self.rows = base_cfg["window_height"]
-    self.cols = 5
+    self.rows, self.cols = self.grid_dims(self.config)
     
-    symbols_def = load_symbols(base_cfg["symbols"])
-    reel_sets = load_reel_sets(base_cfg["reel_sets"], symbols_def)
-    self.machine = SlotMachine(reel_sets=reel_sets, window_height=self.rows)
+    self.model = self.config_watcher.model
+    self.machine = SlotMachine(reel_sets=[], window_height=self.rows, model=self.model)
+    # Vrtljaje računa ena delovna nit (stroja se dotika samo ona), Tk zanka pa le riše.
+    self.spin_executor = ThreadPoolExecutor(max_workers=1)
+    self.log_sink = JsonFileSink()
+    self.pending_spin = None
+    self.prefetched = None
     
     # Slike simbolov
     self.original_images = {}
     self.tk_images = {} 
+    self.image_cache = ImageCache(self.original_images)
+    # Trajni elementi mreže na canvasu: (vrstica, stolpec) -> (slika, besedilo); na novo le ob spremembi velikosti.
+    self.cell_items = {}
+    self.cell_size = None
     if os.path.exists("assets"):
       for filename in os.listdir("assets"):
         if filename.endswith(".png"):
@@ -107,6 +143,9 @@ class SlotMachineGUI:
                   font=("Arial", 16, "bold"), width=8, height=1)
     self.btn_spin.pack(side=tk.RIGHT, padx=20)
     self.canvas.bind("<Configure>", lambda e: self.redraw())
+    self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    if PREFETCH_SPINS:
+      self.prefetch_spin()
     
   def show_info_page(self, rules_text):
     info = tk.Toplevel(self.root)
@@ -326,10 +365,19 @@ class SlotMachineGUI:
       self.finalize_session()
         
   def animate_spin(self, final_all_spins, step=0, index=0):
-    """Ustvari učinek vrtenja z naključnimi simboli."""
-    if step < 15:  # Število premikov pred ustavitvijo      
+    """
+    Ustvari učinek vrtenja z naključnimi simboli.
+    Brez final_all_spins se rezultat še računa: vsak korak preveri, ali je delovna nit končala,
+    in vrtenje se nadaljuje, dokler rezultat ne prispe.
+    """
+    if final_all_spins is None and self.pending_spin is not None and self.pending_spin.done():
+      final_all_spins = self.receive_spin()
+      if final_all_spins is None:
+        return
+    if step < 15 or final_all_spins is None:  # Število premikov pred ustavitvijo      
       # Ustvarimo matriko z naključnimi simboli iz naloženih slik
       random_matrix = []
+      current_state = "base"
       if final_all_spins and index < len(final_all_spins):
         current_state = final_all_spins[index].get("state", "base")
       if current_state == "base":
@@ -415,12 +463,14 @@ class SlotMachineGUI:
     
     self.root.after(40, lambda: self.shake_specific_symbols(tags_to_shake, count - 1, offset))
   
-  def draw_grid(self, matrix, wins=None):
+  def layout_grid(self, w, h):
+    """Ustvari kvadratke in prazne elemente za simbole (le ob spremembi velikosti celic)."""
     self.canvas.delete("all")
-    self.last_matrix = matrix
-    w, h = self.get_cell_dims()
+    self.cell_items = {}
+    self.tk_images = {}
+    self.cell_size = (w, h)
+    text_font_size = self.get_dynamic_font_size(16)
 
-    # 1. Narišemo ločene kvadratke in simbole
     for r in range(self.rows):
       for c in range(self.cols):
         x0, y0 = c * w, r * h
@@ -432,22 +482,40 @@ class SlotMachineGUI:
         # Dodamo notranji "inset" efekt za videz ločenih celic
         self.canvas.create_rectangle(x0+4, y0+4, x1-4, y1-4, outline="#333", width=1)
 
-        sym = matrix[r][c]
         mid_x, mid_y = x0 + w//2, y0 + h//2
+        image_item = self.canvas.create_image(mid_x, mid_y, state="hidden")
+        text_item = self.canvas.create_text(mid_x, mid_y, text="", fill="white", 
+                font=("Arial", text_font_size, "bold"))
+        self.cell_items[(r, c)] = (image_item, text_item)
+
+  def draw_grid(self, matrix, wins=None):
+    self.canvas.delete("winline")
+    self.last_matrix = matrix
+    w, h = self.get_cell_dims()
+    if (w, h) != self.cell_size:
+      self.layout_grid(w, h)
+    # Skaliranje slike, da se prilega kvadratku z nekaj odmika (padding)
+    image_size = (max(1, int(w*0.8)), max(1, int(h*0.8)))
+
+    # 1. V obstoječih elementih zamenjamo le sliko ali besedilo
+    for r in range(self.rows):
+      for c in range(self.cols):
+        image_item, text_item = self.cell_items[(r, c)]
+        sym = matrix[r][c]
+        # Morebitno tresenje je element premaknilo, zato ga vrnemo na sredino celice.
+        self.canvas.coords(image_item, c * w + w//2, r * h + h//2)
         
         if sym in self.original_images:
-          # Skaliranje slike, da se prilega kvadratku z nekaj odmika (padding)
-          img = self.original_images[sym].resize((int(w*0.8), int(h*0.8)), Image.LANCZOS)
-          tk_img = ImageTk.PhotoImage(img)
-          self.tk_images[f"{r}_{c}"] = tk_img 
+          tk_img = self.image_cache.get(sym, image_size)
+          self.tk_images[(r, c)] = tk_img
           symbol_tags = ()
           if "CP" in sym:
             symbol_tags = ("CP", f"shake_{r}_{c}")
-          self.canvas.create_image(mid_x, mid_y, image=tk_img, tags=symbol_tags)
+          self.canvas.itemconfigure(image_item, image=tk_img, tags=symbol_tags, state="normal")
+          self.canvas.itemconfigure(text_item, state="hidden")
         else:
-          text_font_size = self.get_dynamic_font_size(16)
-          self.canvas.create_text(mid_x, mid_y, text=sym, fill="white", 
-                font=("Arial", text_font_size, "bold"))
+          self.canvas.itemconfigure(image_item, state="hidden", tags=())
+          self.canvas.itemconfigure(text_item, text=sym, state="normal")
 
   # 2. Narišemo zmagovalne linije (Winlines)
   def draw_only_lines(self, wins):
@@ -466,8 +534,8 @@ class SlotMachineGUI:
       points.append(c * w + w//2)
       points.append(r * h + h//2)
     
-    self.canvas.create_line(points, fill="white", width=6, capstyle=tk.ROUND)
-    self.canvas.create_line(points, fill=color, width=3, capstyle=tk.ROUND)
+    self.canvas.create_line(points, fill="white", width=6, capstyle=tk.ROUND, tags="winline")
+    self.canvas.create_line(points, fill=color, width=3, capstyle=tk.ROUND, tags="winline")
     
   def show_bonus_trigger_popup(self, num_spins, callback):
     """Prikaže popup ob zadetku bonus igre."""
@@ -505,9 +573,70 @@ class SlotMachineGUI:
     self.balance -= self.bet_amount
     self.label_balance.config(text=f"Credit: {self.balance:.2f} €")
     self.label_status.config(text="Spinning...", fg="gold")
-    outcome, _ = spin_machine(self.machine, self.config, self.bet_amount, save_log=True)
-    # ZAČNEMO ANIMACIJO namesto takojšnjega izrisa
-    self.animate_spin(outcome["all_spins"], step=0, index=0)
+    self.reload_config()
+    # Vnaprej izračunan vrtljaj uporabimo le, če je bil za isto stavo.
+    if self.prefetched is not None and self.prefetched[0] == self.bet_amount:
+      self.pending_spin = self.prefetched[1]
+    else:
+      self.pending_spin = self.spin_executor.submit(self.compute_spin, self.bet_amount, self.config, self.model)
+    self.prefetched = None
+    # ZAČNEMO ANIMACIJO takoj, rezultat prevzame animate_spin, ko je na voljo
+    self.animate_spin(None, step=0, index=0)
+
+  @staticmethod
+  def grid_dims(config):
+    """Vrstice in stolpci mreže: višina okna in število kolutov osnovne igre."""
+    base_cfg = config["base"]
+    return base_cfg["window_height"], len(base_cfg["reel_sets"][0]["reels"])
+
+  def reload_config(self):
+    """Teče v Tk niti: ob spremembi configa prevzame novi model in po potrebi na novo razporedi mrežo."""
+    if not self.config_watcher.poll():
+      return
+    self.config, self.model = self.config_watcher.config, self.config_watcher.model
+    # Vnaprej izračunan vrtljaj je iz starega modela.
+    if self.prefetched is not None:
+      self.prefetched[1].cancel()
+      self.prefetched = None
+    rows, cols = self.grid_dims(self.config)
+    if (rows, cols) != (self.rows, self.cols):
+      self.rows, self.cols = rows, cols
+      self.last_matrix = None
+      self.layout_grid(*self.get_cell_dims())
+
+  def compute_spin(self, bet, config, model):
+    """Teče v delovni niti: celotna seja in dnevnik vrtljajev (zapis v bazo šele ob prevzemu)."""
+    # Model zamenja ta nit, ker se stroja dotika samo ona; Tk nit ji poda trenutni config in model.
+    self.machine.model = model
+    outcome, _ = spin_machine(self.machine, config, bet, save_log=False)
+    # Dnevnik vrtljajev se zgradi tukaj, da ga glavna nit le prebere.
+    outcome.all_spins
+    return outcome
+
+  def prefetch_spin(self):
+    self.prefetched = (self.bet_amount, self.spin_executor.submit(self.compute_spin, self.bet_amount,
+                                                                 self.config, self.model))
+
+  def receive_spin(self):
+    """Prevzame izračunan vrtljaj; zapis seje in naslednji vrtljaj se izvedeta v delovni niti."""
+    future, self.pending_spin = self.pending_spin, None
+    try:
+      outcome = future.result()
+    except Exception as e:
+      self.balance += self.bet_amount
+      self.finalize_session()
+      messagebox.showerror("Error", f"Spin failed: {e}")
+      return None
+    # Vnaprej izračunana seja dobi čas dejanskega igranja.
+    outcome.timestamp = datetime.now().isoformat()
+    self.spin_executor.submit(self.log_sink.write, outcome.to_dict())
+    if PREFETCH_SPINS:
+      self.prefetch_spin()
+    return outcome["all_spins"]
+
+  def on_close(self):
+    self.spin_executor.shutdown(wait=False, cancel_futures=True)
+    self.root.destroy()
 
   def finalize_session(self):
     self.balance += self.session_total_win